@@ -1,20 +1,198 @@
 # agent/certificate_agent.py
+import asyncio
+import json
 import os
 import sys
+from datetime import timedelta
 from pathlib import Path
 
-# Ensure we can import from the sibling 'server' directory
-CURRENT_DIR = Path(__file__).resolve().parent
-SERVER_DIR = CURRENT_DIR.parent / "server"
-if str(SERVER_DIR) not in sys.path:
-    sys.path.insert(0, str(SERVER_DIR))
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
 
-from certificate_server import create_certificate  # type: ignore
+SERVER_SCRIPT = Path(__file__).resolve().parent / "certificate_server.py"
+
+
+def server_params() -> StdioServerParameters:
+    """Parameters for spawning one certificate server subprocess"""
+    return StdioServerParameters(
+        command=sys.executable,
+        args=[str(SERVER_SCRIPT)],
+        cwd=str(SERVER_SCRIPT.parent),
+        # Pass CERT_* settings through; stdio_client only forwards a minimal environment by default
+        env=dict(os.environ),
+    )
+
+
+class ToolCallError(RuntimeError):
+    """The server ran the tool and reported an error; not retried."""
+
+
+# -------------------
+# One long-lived server session
+# -------------------
+class ServerWorker:
+    """
+    A certificate server subprocess with an initialized MCP session.
+
+    The stdio transport is opened and closed inside one background task,
+    as anyio requires; requests are sent from any task.
+    """
+
+    def __init__(self, index: int):
+        self.index = index
+        self.outstanding = 0
+        self.restarts = 0
+        self.session = None
+        self._stop = None
+        self._task = None
+
+    async def start(self):
+        self._stop = asyncio.Event()
+        ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run(ready))
+        await ready
+
+    async def _run(self, ready):
+        try:
+            async with stdio_client(server_params()) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self.session = session
+                    ready.set_result(None)
+                    await self._stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+        finally:
+            self.session = None
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stop.set()
+        try:
+            await asyncio.wait_for(self._task, 10)
+        except (Exception, asyncio.TimeoutError):
+            self._task.cancel()
+        self._task = None
+
+    async def restart(self):
+        await self.stop()
+        self.restarts += 1
+        await self.start()
+
+
+# -------------------
+# Pool of sessions with least-outstanding-requests balancing
+# -------------------
+class CertificateClientPool:
+    """
+    Keeps ``size`` certificate server subprocesses open and shards calls across them.
+
+    Each call goes to the worker with the fewest outstanding requests. A
+    call that fails at the transport level (the worker died or stopped
+    answering within ``timeout``) restarts that worker and is retried on
+    the least-loaded one, up to ``retries`` times.
+
+    Usage:
+        async with CertificateClientPool(size=4) as pool:
+            results = await pool.request_certificates(people)
+    """
+
+    def __init__(self, size: int | None = None, retries: int = 2, timeout: float = 120.0):
+        self.size = max(1, size or os.cpu_count() or 1)
+        self.retries = retries
+        self.timeout = timedelta(seconds=timeout)
+        self.workers = [ServerWorker(i) for i in range(self.size)]
+        self._restarting = {}
+
+    async def __aenter__(self):
+        await asyncio.gather(*(worker.start() for worker in self.workers))
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.gather(*(worker.stop() for worker in self.workers))
+
+    def _pick(self) -> ServerWorker:
+        live = [w for w in self.workers if w.session is not None and w.index not in self._restarting]
+        return min(live or self.workers, key=lambda w: w.outstanding)
+
+    async def _restart(self, worker: ServerWorker):
+        # Concurrent failures on the same worker share one restart
+        task = self._restarting.get(worker.index)
+        if task is None:
+            task = self._restarting[worker.index] = asyncio.create_task(worker.restart())
+            task.add_done_callback(lambda _: self._restarting.pop(worker.index, None))
+        await task
+
+    async def call_tool(self, name: str, arguments: dict):
+        """Call a tool on the least-loaded worker, restarting dead workers and retrying"""
+        for attempt in range(self.retries + 1):
+            worker = self._pick()
+            if worker.session is None:
+                await self._restart(worker)
+            worker.outstanding += 1
+            try:
+                result = await worker.session.call_tool(name, arguments, read_timeout_seconds=self.timeout)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                await self._restart(worker)
+                continue
+            finally:
+                worker.outstanding -= 1
+            if result.isError:
+                raise ToolCallError(result.content[0].text if result.content else f"{name} failed")
+            return result
+
+    async def request_certificate(self, name: str, course: str, date: str, **options) -> dict:
+        """Create one certificate; returns create_certificate's result (path, bytes, ...)"""
+        result = await self.call_tool("create_certificate", {"name": name, "course": course, "date": date, **options})
+        return json.loads(result.content[0].text)
+
+    async def request_certificates(self, people, concurrency: int | None = None, on_result=None, **options) -> list:
+        """
+        Create a certificate for every person in ``people``.
+
+        Args:
+            people: Iterable of ``{"name", "course", "date"}`` dicts or
+                ``(name, course, date)`` tuples; consumed lazily
+            concurrency: Requests in flight across the pool (default: 2 per worker)
+            on_result: Optional callback ``(person, result, error)`` invoked
+                as soon as each certificate finishes
+            options: Encoding options passed to create_certificate
+
+        Returns:
+            ``(result, error)`` per person, in input order
+        """
+        concurrency = max(1, concurrency or 2 * self.size)
+        results = []
+        iterator = iter(enumerate(people))
+
+        async def pump():
+            for index, person in iterator:
+                if not isinstance(person, dict):
+                    person = dict(zip(("name", "course", "date"), person))
+                result, error = None, None
+                try:
+                    result = await self.request_certificate(**person, **options)
+                except Exception as e:
+                    error = str(e) or e.__class__.__name__
+                results.append((index, result, error))
+                if on_result:
+                    on_result(person, result, error)
+
+        await asyncio.gather(*(pump() for _ in range(concurrency)))
+        return [(result, error) for _, result, error in sorted(results, key=lambda r: r[0])]
 
 
 def request_certificate(name: str, course: str, date: str) -> str:
-    # Directly call the server tool function for local testing
-    return create_certificate(name=name, course=course, date=date)
+    """Create a single certificate through a one-worker pool; returns its path"""
+    async def run():
+        async with CertificateClientPool(size=1) as pool:
+            return await pool.request_certificate(name, course, date)
+
+    return asyncio.run(run())["path"]
 
 # Example usage
 if __name__ == "__main__":
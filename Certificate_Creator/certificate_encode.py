@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Output encoding for certificates
+
+Single certificates are saved as PNG, JPEG or WebP with tunable
+compression. Batches can instead be appended to one multi-page PDF or
+ZIP bundle that is written page by page, so a cohort never sits in memory.
+"""
+
+import io
+import os
+import zlib
+
+from PIL import Image
+
+FORMATS = ("png", "jpeg", "webp")
+BUNDLES = ("pdf", "zip")
+EXTENSIONS = {"png": "png", "jpeg": "jpg", "webp": "webp"}
+
+# Server-level defaults (override via environment or per call)
+DEFAULT_FORMAT = os.getenv("CERT_FORMAT", "png")
+DEFAULT_QUALITY = int(os.getenv("CERT_QUALITY", "90"))
+DEFAULT_PNG_COMPRESS_LEVEL = int(os.getenv("CERT_PNG_COMPRESS_LEVEL", "6"))
+DEFAULT_PNG_OPTIMIZE = os.getenv("CERT_PNG_OPTIMIZE", "0") == "1"
+# Used for the PDF page size when the template carries no DPI
+DEFAULT_PDF_DPI = 150
+
+
+def encoding_options(output_format: str = "", quality: int = 0, compress_level: int = -1,
+                     optimize: bool | None = None) -> dict:
+    """Merge per-call options over the server defaults and validate them"""
+    fmt = (output_format or DEFAULT_FORMAT).lower()
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format '{fmt}' (use {', '.join(FORMATS)})")
+    quality = quality or DEFAULT_QUALITY
+    if not 1 <= quality <= 100:
+        raise ValueError("quality must be between 1 and 100")
+    compress_level = DEFAULT_PNG_COMPRESS_LEVEL if compress_level < 0 else compress_level
+    if not 0 <= compress_level <= 9:
+        raise ValueError("compress_level must be between 0 and 9")
+    return {
+        "format": fmt,
+        "quality": quality,
+        "compress_level": compress_level,
+        "optimize": DEFAULT_PNG_OPTIMIZE if optimize is None else bool(optimize),
+    }
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """JPEG and PDF pages have no alpha channel; composite onto white"""
+    if image.mode in ("RGB", "L"):
+        return image
+    if "A" in image.getbands() or image.mode == "P":
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def encode(image: Image.Image, options: dict) -> bytes:
+    """Encode ``image`` as a standalone PNG, JPEG or WebP file"""
+    buffer = io.BytesIO()
+    fmt = options["format"]
+    if fmt == "png":
+        # optimize=True makes Pillow search for the smallest output (implies level 9)
+        image.save(buffer, "PNG", compress_level=options["compress_level"], optimize=options["optimize"])
+    elif fmt == "jpeg":
+        image = _flatten(image)
+        image.save(buffer, "JPEG", quality=options["quality"], optimize=options["optimize"])
+    else:
+        image.save(buffer, "WEBP", quality=options["quality"])
+    return buffer.getvalue()
+
+
+def pdf_page(image: Image.Image, options: dict) -> dict:
+    """
+    Encode ``image`` as a ready-to-embed PDF page image.
+
+    PNG output stays lossless (Flate-compressed pixels); JPEG and WebP
+    output embed a JPEG at the requested quality, as PDF has no WebP filter.
+    """
+    image = _flatten(image)
+    dpi = image.info.get("dpi", (DEFAULT_PDF_DPI,))[0] or DEFAULT_PDF_DPI
+    page = {
+        "width": image.width,
+        "height": image.height,
+        "dpi": float(dpi),
+        "colorspace": "DeviceGray" if image.mode == "L" else "DeviceRGB",
+    }
+    if options["format"] == "png":
+        page["filter"] = "FlateDecode"
+        page["data"] = zlib.compress(image.tobytes(), options["compress_level"])
+    else:
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=options["quality"])
+        page["filter"] = "DCTDecode"
+        page["data"] = buffer.getvalue()
+    return page
+
+
+class PdfStreamWriter:
+    """
+    Minimal PDF writer that appends one image page at a time.
+
+    Only byte offsets are kept per page; the page tree, catalog and
+    cross-reference table are written by ``close()``.
+    """
+
+    _CATALOG, _PAGES = 1, 2
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.offsets = {}
+        self.kids = []
+        self.next_id = 3
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data: bytes):
+        self.fp.write(data)
+
+    def _object(self, body: bytes, stream: bytes | None = None, obj_id: int | None = None) -> int:
+        if obj_id is None:
+            obj_id, self.next_id = self.next_id, self.next_id + 1
+        self.offsets[obj_id] = self.fp.tell()
+        self._write(b"%d 0 obj\n" % obj_id + body)
+        if stream is not None:
+            self._write(b"\nstream\n" + stream + b"\nendstream")
+        self._write(b"\nendobj\n")
+        return obj_id
+
+    def add_page(self, page: dict) -> int:
+        """Append a page produced by ``pdf_page``; returns its 1-based page number"""
+        width, height = page["width"], page["height"]
+        scale = 72.0 / page["dpi"]
+        pw, ph = width * scale, height * scale
+        image_id = self._object(
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /%s "
+            b"/BitsPerComponent 8 /Filter /%s /Length %d >>"
+            % (width, height, page["colorspace"].encode(), page["filter"].encode(), len(page["data"])),
+            page["data"],
+        )
+        content = b"q %.2f 0 0 %.2f 0 0 cm /Im0 Do Q" % (pw, ph)
+        content_id = self._object(b"<< /Length %d >>" % len(content), content)
+        page_id = self._object(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] "
+            b"/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>"
+            % (self._PAGES, pw, ph, image_id, content_id)
+        )
+        self.kids.append(page_id)
+        return len(self.kids)
+
+    def close(self):
+        kids = b" ".join(b"%d 0 R" % kid for kid in self.kids)
+        self._object(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.kids)), obj_id=self._PAGES)
+        self._object(b"<< /Type /Catalog /Pages %d 0 R >>" % self._PAGES, obj_id=self._CATALOG)
+        xref = self.fp.tell()
+        size = self.next_id
+        lines = [b"xref\n0 %d\n" % size, b"0000000000 65535 f \n"]
+        for obj_id in range(1, size):
+            lines.append(b"%010d 00000 n \n" % self.offsets[obj_id])
+        self._write(b"".join(lines))
+        self._write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%EOF\n" % (size, self._CATALOG, xref))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing instrumentation for certificate rendering
+
+Disabled unless CERT_METRICS=1. When disabled, ``stage()`` hands back one
+shared no-op context manager and ``count()`` returns at once, so the hot
+path pays only a function call. Histograms use fixed millisecond buckets,
+so snapshots from bulk worker processes can be merged by adding counts.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+
+# The histogram is shared with the request metrics at the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from mcp_metrics import Histogram
+
+ENABLED = os.getenv("CERT_METRICS", "0") == "1"
+
+_NOOP = nullcontext()
+
+
+_stages = {}    # stage name -> Histogram
+_counters = {}  # name -> running total (pixel counts, certificates)
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+def stage(name: str):
+    """Context manager timing one stage; a shared no-op when metrics are disabled"""
+    return _Stage(name) if ENABLED else _NOOP
+
+
+def record(name: str, ms: float):
+    if ENABLED:
+        hist = _stages.get(name)
+        if hist is None:
+            hist = _stages[name] = Histogram()
+        hist.add(ms)
+
+
+def count(name: str, amount: int = 1):
+    if ENABLED:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def drain() -> dict | None:
+    """Return and reset this process's raw metrics (bulk workers ship them to the server)"""
+    if not ENABLED or not (_stages or _counters):
+        return None
+    snapshot = {"stages": {name: h.raw() for name, h in _stages.items()}, "counters": dict(_counters)}
+    _stages.clear()
+    _counters.clear()
+    return snapshot
+
+
+def merge(snapshot: dict | None):
+    """Fold a worker snapshot from ``drain()`` into this process's metrics"""
+    if not snapshot:
+        return
+    for name, raw in snapshot["stages"].items():
+        _stages.setdefault(name, Histogram()).merge(raw)
+    for name, amount in snapshot["counters"].items():
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def report() -> dict:
+    return {
+        "enabled": ENABLED,
+        "stages": {name: h.summary() for name, h in sorted(_stages.items())},
+        "counters": dict(sorted(_counters.items())),
+    }
+
+
+def profile_call(fn, directory: str, label: str, top: int = 15):
+    """
+    Run ``fn()`` under cProfile and dump the stats to ``directory``.
+
+    Returns ``(result, dump_path, top_functions_text)``; open the dump
+    with ``python -m pstats`` or snakeviz.
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{label}_{datetime.now():%Y%m%d_%H%M%S_%f}.prof")
+    profiler.dump_stats(path)
+    text = io.StringIO()
+    pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(top)
+    return result, path, text.getvalue()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Streaming roster readers for bulk certificate generation
+
+A roster is CSV (with a header row) or JSON: an array of objects or one
+object per line (JSON Lines). Rows are yielded one at a time, so a roster
+file with thousands of people is never loaded into memory at once.
+"""
+
+import csv
+import io
+import json
+import os
+import re
+
+FIELDS = ("name", "course", "date")
+_CHUNK = 64 * 1024
+_SEPARATORS = re.compile(r"[\s,\[\]]*")
+
+
+def open_roster(roster: str):
+    """Return a text stream over a roster given as a file path or inline text"""
+    if "\n" not in roster and os.path.isfile(roster):
+        return open(roster, "r", encoding="utf-8-sig", newline="")
+    return io.StringIO(roster)
+
+
+def detect_format(roster: str, stream) -> str:
+    """'csv' or 'json', from the file extension or the first non-blank character"""
+    ext = os.path.splitext(roster)[1].lower() if "\n" not in roster else ""
+    if ext == ".csv":
+        return "csv"
+    if ext in (".json", ".jsonl", ".ndjson"):
+        return "json"
+    start = stream.tell()
+    while True:
+        ch = stream.read(1)
+        if not ch or not ch.isspace():
+            break
+    stream.seek(start)
+    return "json" if ch in ("[", "{") else "csv"
+
+
+def _iter_json(stream):
+    """Yield the objects of a JSON array or JSON Lines stream without reading it all"""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+    while True:
+        # Skip array brackets, separators and whitespace between objects
+        pos = _SEPARATORS.match(buffer, pos).end()
+        if pos < len(buffer):
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError("Roster is not valid JSON") from None
+            else:
+                yield item
+                continue
+        elif eof:
+            return
+        # Out of complete objects: keep the unparsed tail and read more
+        chunk = stream.read(_CHUNK)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def iter_roster(roster: str, roster_format: str | None = None, defaults: dict | None = None):
+    """
+    Yield ``(row_number, {"name", "course", "date"})`` for every roster entry.
+
+    Column names are matched case-insensitively; ``defaults`` fills in a
+    course or date missing from a row (e.g. one course for a whole cohort).
+    """
+    defaults = {k: v for k, v in (defaults or {}).items() if v}
+    with open_roster(roster) as stream:
+        fmt = roster_format or detect_format(roster, stream)
+        if fmt == "csv":
+            rows = csv.DictReader(stream)
+        elif fmt == "json":
+            rows = _iter_json(stream)
+        else:
+            raise ValueError(f"Unknown roster format '{fmt}' (use csv or json)")
+        for number, row in enumerate(rows, start=1):
+            if not isinstance(row, dict):
+                raise ValueError(f"Roster row {number} is not an object")
+            fields = {str(k).strip().lower(): v for k, v in row.items() if k is not None}
+            entry = {}
+            for field in FIELDS:
+                value = fields.get(field)
+                value = str(value).strip() if value is not None else ""
+                entry[field] = value or defaults.get(field, "")
+            yield number, entry
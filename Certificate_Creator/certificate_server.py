@@ -1,8 +1,28 @@
 # server/certificate_server.py
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
 from PIL import Image, ImageDraw, ImageFont
+import asyncio
+import contextlib
+import itertools
+import json
+import multiprocessing
 import os
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from pathlib import Path
+import certificate_metrics as metrics
+from certificate_encode import BUNDLES, EXTENSIONS, PdfStreamWriter, encode, encoding_options, pdf_page
+from certificate_roster import iter_roster
+from certificate_store import CertificateStore, file_identity, make_key
+
+# Shared transport options (stdio or a localhost HTTP/SSE daemon) and request metrics live at the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import mcp_metrics
+import mcp_transport
 
 app = FastMCP("certificate-server")
 
@@ -10,12 +30,99 @@ DATA_DIR = os.path.join(os.path.dirname(__file__), "../data")
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "../output")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Worker processes for create_certificates_bulk (override via environment)
+CERT_WORKERS = int(os.getenv("CERT_WORKERS", os.cpu_count() or 1))
+
+# Certificate layout; part of every certificate's store key
+FONT_PATH = "arial.ttf"
+FONT_SIZE = 40
+TEXT_POSITION = (150, 300)
+TEXT_FILL = "black"
+
+# Content-addressed output store (see certificate_store.py)
+store = CertificateStore(os.path.join(OUTPUT_DIR, "certificates"))
+# cProfile dumps from create_certificate(profile=True)
+PROFILE_DIR = os.path.join(OUTPUT_DIR, "profiles")
+
 # -------------------
 # Resource: Certificate Template (helper function)
 # -------------------
 def certificate_template() -> str:
     return os.path.join(DATA_DIR, "certificate.png")
 
+# -------------------
+# Template & Font Cache
+# -------------------
+# Decoded templates keyed by path; an entry is reloaded when the file's mtime changes
+_templates = {}  # path -> (mtime_ns, decoded image)
+# Parsed fonts keyed by (path, size); a failed load caches the default-font fallback
+_fonts = {}
+_cache_lock = threading.Lock()
+_cache_stats = {
+    "template_hits": 0,
+    "template_loads": 0,
+    "template_invalidations": 0,
+    "font_hits": 0,
+    "font_loads": 0,
+    "font_fallbacks": 0,
+}
+
+
+def load_template(path: str) -> Image.Image:
+    """Return a fresh copy of the decoded template to draw on"""
+    mtime = os.stat(path).st_mtime_ns
+    with _cache_lock:
+        cached = _templates.get(path)
+        if cached is not None and cached[0] == mtime:
+            _cache_stats["template_hits"] += 1
+            return cached[1].copy()
+        if cached is not None:
+            _cache_stats["template_invalidations"] += 1
+        with Image.open(path) as image:
+            image.load()  # decode now, while the file is open
+            decoded = image.copy()
+        _templates[path] = (mtime, decoded)
+        _cache_stats["template_loads"] += 1
+        return decoded.copy()
+
+
+def load_font(path: str, size: int) -> ImageFont.ImageFont:
+    """Return the parsed font for (path, size), falling back to the default bitmap font"""
+    key = (path, size)
+    with _cache_lock:
+        font = _fonts.get(key)
+        if font is not None:
+            _cache_stats["font_hits"] += 1
+            return font
+        try:
+            font = ImageFont.truetype(path, size)
+        except OSError:
+            # Fallback to default bitmap font if TTF not available
+            font = ImageFont.load_default()
+            _cache_stats["font_fallbacks"] += 1
+        _fonts[key] = font
+        _cache_stats["font_loads"] += 1
+        return font
+
+
+@app.resource(
+    "resource://certificate-cache",
+    name="Certificate Cache Stats",
+    description="Hit/load counters and entries of the template and font caches",
+    mime_type="application/json",
+)
+def certificate_cache_stats() -> str:
+    with _cache_lock:
+        stats = {
+            **_cache_stats,
+            "templates": [
+                {"path": path, "size": list(image.size), "mode": image.mode}
+                for path, (_, image) in _templates.items()
+            ],
+            "fonts": [{"path": path, "size": size} for path, size in _fonts],
+        }
+    return json.dumps(stats, indent=2)
+
 # -------------------
 # Tool: Generate Text for Certificate
 # -------------------
@@ -26,37 +133,349 @@ def generate_text(name: str, course: str, date: str) -> str:
 # -------------------
 # Tool: Create Certificate Image
 # -------------------
-@app.tool("create_certificate")
-def create_certificate(name: str, course: str, date: str) -> str:
+def render_certificate(name: str, course: str, date: str) -> Image.Image:
     # 1. Get the text
     text = generate_text(name, course, date)
 
-    # 2. Load template
+    # 2. Load template (decoded once, copied per certificate)
     template_path = certificate_template()
-    image = Image.open(template_path)
+    with metrics.stage("template"):
+        image = load_template(template_path)
     draw = ImageDraw.Draw(image)
 
-    # 3. Choose font (ensure arial.ttf exists)
-    font_path = "arial.ttf"
-    try:
-        font = ImageFont.truetype(font_path, 40)
-    except OSError:
-        # Fallback to default bitmap font if TTF not available
-        font = ImageFont.load_default()
+    # 3. Choose font (ensure arial.ttf exists; parsed once per size)
+    with metrics.stage("font"):
+        font = load_font(FONT_PATH, FONT_SIZE)
 
     # 4. Overlay text (example coordinates)
-    draw.text((150, 300), text, font=font, fill="black")
+    with metrics.stage("draw"):
+        draw.text(TEXT_POSITION, text, font=font, fill=TEXT_FILL)
+    if metrics.ENABLED:
+        left, top, right, bottom = draw.textbbox(TEXT_POSITION, text, font=font)
+        metrics.count("template_pixels", image.width * image.height)
+        metrics.count("text_pixels", (right - left) * (bottom - top))
+    return image
+
+
+def asset_identity() -> dict:
+    """Content hashes of the template and the font that render_certificate would use"""
+    font = load_font(FONT_PATH, FONT_SIZE)
+    font_file = getattr(font, "path", None)
+    return {
+        "template": file_identity(certificate_template()),
+        # The default bitmap font has no file; it only changes with Pillow itself
+        "font": file_identity(font_file) if isinstance(font_file, str) else "default",
+    }
+
+
+def certificate_key(name: str, course: str, date: str, options: dict, assets: dict) -> str:
+    """Store key over every input that changes the certificate's bytes"""
+    fmt = options["format"]
+    encoding = {"format": fmt}
+    if fmt == "png":
+        encoding.update(compress_level=options["compress_level"], optimize=options["optimize"])
+    else:
+        encoding["quality"] = options["quality"]
+        if fmt == "jpeg":
+            encoding["optimize"] = options["optimize"]
+    return make_key({
+        "name": name,
+        "course": course,
+        "date": date,
+        **assets,
+        "font_size": FONT_SIZE,
+        "layout": [*TEXT_POSITION, TEXT_FILL],
+        "encoding": encoding,
+    })
+
+
+@app.tool("create_certificate")
+def create_certificate(
+    name: str,
+    course: str,
+    date: str,
+    output_format: str = "",
+    quality: int = 0,
+    compress_level: int = -1,
+    optimize: bool | None = None,
+    profile: bool = False,
+) -> dict:
+    """
+    Render one certificate and save it to the output folder.
+
+    ``output_format`` is png, jpeg or webp (server default: CERT_FORMAT).
+    ``quality`` applies to JPEG/WebP, ``compress_level`` (0-9) and
+    ``optimize`` to PNG. Outputs are content-addressed: a certificate that
+    was already rendered with the same inputs, template, font and encoding
+    is returned without redrawing (``cached``). ``profile`` renders afresh
+    under cProfile and returns the dump path and the top functions.
+    Returns the output path, its size in bytes and the encode time.
+    """
+    options = encoding_options(output_format, quality, compress_level, optimize)
+    if profile:
+        result, dump_path, top = metrics.profile_call(
+            lambda: _create_certificate(name, course, date, options, lookup=False),
+            PROFILE_DIR,
+            "create_certificate",
+        )
+        return {**result, "profile": dump_path, "profile_top": top}
+    return _create_certificate(name, course, date, options)
+
+
+def _create_certificate(name: str, course: str, date: str, options: dict, lookup: bool = True) -> dict:
+    with metrics.stage("total"):
+        assets = asset_identity()
+        key = certificate_key(name, course, date, options, assets)
+        extension = EXTENSIONS[options["format"]]
+        if lookup:
+            with metrics.stage("lookup"):
+                entry = store.lookup(key, name, extension)
+            if entry is not None:
+                metrics.count("store_hits")
+                return {"path": entry["path"], "format": options["format"], "bytes": entry["bytes"],
+                        "encode_ms": 0.0, "cached": True}
+
+        image = render_certificate(name, course, date)
+
+        # 5. Encode and save output
+        start = time.perf_counter()
+        data = encode(image, options)
+        encode_ms = (time.perf_counter() - start) * 1000
+        metrics.record("encode", encode_ms)
+        meta = {"name": name, "course": course, "date": date, "format": options["format"], **assets}
+        with metrics.stage("save"):
+            entry = store.write(key, name, extension, data, meta)
+        metrics.count("certificates")
+        metrics.count("output_bytes", len(data))
+
+    return {"path": entry["path"], "format": options["format"], "bytes": len(data),
+            "encode_ms": round(encode_ms, 2), "cached": False}
+
+
+@app.resource(
+    "resource://certificate-metrics",
+    name="Certificate Rendering Metrics",
+    description="Per-stage duration histograms and pixel counters (enable with CERT_METRICS=1)",
+    mime_type="application/json",
+)
+def certificate_metrics() -> str:
+    return json.dumps(metrics.report(), indent=2)
+
+
+@app.tool("certificate_store_gc")
+def certificate_store_gc(dry_run: bool = False, remove_stale: bool = False) -> str:
+    """
+    Garbage-collect the certificate output store.
+
+    Drops index entries whose file was deleted and removes files that no
+    index entry references. With ``remove_stale`` it also removes
+    certificates rendered from an older template or font. ``dry_run``
+    only reports what would be removed.
+    """
+    is_stale = None
+    if remove_stale:
+        current = asset_identity()
+        is_stale = lambda entry: any(
+            key in entry and entry[key] != value for key, value in current.items()
+        )
+    return json.dumps(store.gc(dry_run=dry_run, is_stale=is_stale), indent=2)
+
+# -------------------
+# Tool: Bulk Certificates from a Roster
+# -------------------
+def _render_chunk(rows: list, options: dict, bundle: str | None) -> tuple[list, dict | None]:
+    """
+    Worker-side job: render a chunk of roster rows, one result per row.
+
+    Without a bundle each certificate is saved as a file; with one, the
+    encoded bytes (or PDF page) are returned for the server to append.
+    Rows without a name fail here too, so every row is reported in roster
+    order. The worker's metrics since its last chunk ride along with the results.
+    """
+    results = []
+    for number, entry in rows:
+        if not entry["name"]:
+            results.append((number, None, "missing name"))
+            continue
+        try:
+            if bundle is None:
+                result = create_certificate(
+                    **entry,
+                    output_format=options["format"],
+                    quality=options["quality"],
+                    compress_level=options["compress_level"],
+                    optimize=options["optimize"],
+                )
+            else:
+                image = render_certificate(**entry)
+                start = time.perf_counter()
+                payload = pdf_page(image, options) if bundle == "pdf" else encode(image, options)
+                encode_ms = (time.perf_counter() - start) * 1000
+                metrics.record("encode", encode_ms)
+                result = {
+                    "payload": payload,
+                    "format": options["format"],
+                    "bytes": len(payload["data"] if bundle == "pdf" else payload),
+                    "encode_ms": round(encode_ms, 2),
+                }
+                metrics.count("certificates")
+                metrics.count("output_bytes", result["bytes"])
+            results.append((number, result, None))
+        except Exception as e:
+            results.append((number, None, str(e) or e.__class__.__name__))
+    return results, metrics.drain()
+
+
+@app.tool("create_certificates_bulk")
+async def create_certificates_bulk(
+    roster: str,
+    roster_format: str | None = None,
+    course: str = "",
+    date: str = "",
+    workers: int = 0,
+    chunk_size: int = 16,
+    output_format: str = "",
+    quality: int = 0,
+    compress_level: int = -1,
+    optimize: bool | None = None,
+    bundle: str | None = None,
+    ctx: Context = None,
+) -> str:
+    """
+    Render a certificate for every person in a CSV or JSON roster.
+
+    ``roster`` is a file path or inline CSV (with a name,course,date header)
+    or JSON (array or one object per line). ``course`` and ``date`` fill in
+    rows that leave them empty. The roster is streamed and only a few
+    chunks per worker are in flight, so memory stays flat on large cohorts.
+    Encoding options match create_certificate. ``bundle`` set to "pdf" or
+    "zip" appends every certificate, in roster order, to one multi-page
+    PDF or one ZIP file written as a stream instead of separate files.
+    Progress is reported as chunks finish. Returns a JSON summary with the
+    failures, encode totals and the path of a JSON Lines manifest (one line
+    per row).
+    """
+    start = time.perf_counter()
+    options = encoding_options(output_format, quality, compress_level, optimize)
+    if bundle is not None and bundle not in BUNDLES:
+        raise ValueError(f"Unknown bundle '{bundle}' (use {', '.join(BUNDLES)})")
+    workers = max(1, workers or CERT_WORKERS)
+    chunk_size = max(1, chunk_size)
+    stamp = f"{datetime.now():%Y%m%d_%H%M%S_%f}"
+    manifest_path = os.path.join(OUTPUT_DIR, f"manifest_{stamp}.jsonl")
+    bundle_path = os.path.join(OUTPUT_DIR, f"certificates_{stamp}.{bundle}") if bundle else None
+    rows = iter_roster(roster, roster_format, {"course": course, "date": date})
+    entries = {}  # row number -> entry, only while its chunk is in flight
+    counts = {"rows": 0, "rendered": 0, "cached": 0, "failed": 0, "output_bytes": 0, "encode_ms": 0.0}
+    failures = []
+    loop = asyncio.get_running_loop()
+
+    def read_chunk():
+        """Up to chunk_size roster rows, and the roster error that stopped reading early"""
+        chunk = []
+        try:
+            chunk.extend(itertools.islice(rows, chunk_size))
+        except ValueError as e:
+            # Malformed roster: keep the rows read so far, report where it stopped
+            return chunk, str(e)
+        return chunk, None
+
+    def record(manifest, writer, number, result, error):
+        entry = entries.pop(number)
+        line = {"row": number, **entry}
+        if error is None:
+            if bundle == "pdf":
+                line["path"] = bundle_path
+                with metrics.stage("append"):
+                    line["page"] = writer.add_page(result.pop("payload"))
+            elif bundle == "zip":
+                line["path"] = bundle_path
+                line["entry"] = f"{number:06d}_{entry['name'].replace(' ', '_')}.{EXTENSIONS[options['format']]}"
+                # Already-compressed images gain nothing from deflate
+                with metrics.stage("append"):
+                    writer.writestr(line["entry"], result.pop("payload"), compress_type=zipfile.ZIP_STORED)
+            line.update(result)
+            if result.get("cached"):
+                counts["cached"] += 1
+            counts["rendered"] += 1
+            counts["output_bytes"] += result["bytes"]
+            counts["encode_ms"] += result["encode_ms"]
+        else:
+            line["error"] = error
+            counts["failed"] += 1
+            if len(failures) < 100:
+                failures.append(line)
+        manifest.write(json.dumps(line) + "\n")
+
+    async def collect(manifest, writer, futures):
+        # Oldest chunk first, so the manifest and any bundle follow roster order
+        future = next(iter(futures))
+        chunk = futures.pop(future)
+        try:
+            results, snapshot = await future
+            metrics.merge(snapshot)
+        except Exception as e:
+            # The whole chunk was lost (e.g. a worker crashed)
+            results = [(number, None, str(e) or e.__class__.__name__) for number, _ in chunk]
+        def record_all():
+            for number, result, error in results:
+                record(manifest, writer, number, result, error)
+
+        # Manifest lines and bundle appends are blocking file writes; chunks
+        # are collected one at a time, so the writes stay in roster order
+        await asyncio.to_thread(record_all)
+        if ctx is not None:
+            finished = counts["rendered"] + counts["failed"]
+            await ctx.report_progress(finished, message=f"{finished} certificates processed, {counts['failed']} failed")
+
+    with contextlib.ExitStack() as stack:
+        # "spawn" avoids forking the server while stdio reader threads are live
+        pool = stack.enter_context(
+            ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        )
+        manifest = stack.enter_context(open(manifest_path, "w", encoding="utf-8"))
+        writer = None
+        if bundle == "pdf":
+            writer = PdfStreamWriter(stack.enter_context(open(bundle_path, "wb")))
+            stack.callback(writer.close)
+        elif bundle == "zip":
+            writer = stack.enter_context(zipfile.ZipFile(bundle_path, "w"))
+        futures = {}  # future -> chunk of (row number, entry), in submission order
+        roster_error = None
 
-    # 5. Save output
-    file_name = f"{name.replace(' ', '_')}_certificate.png"
-    output_path = os.path.join(OUTPUT_DIR, file_name)
-    image.save(output_path)
+        while roster_error is None:
+            # The roster is parsed off the event loop, one chunk at a time
+            chunk, roster_error = await asyncio.to_thread(read_chunk)
+            if not chunk:
+                break
+            counts["rows"] += len(chunk)
+            entries.update(chunk)
+            futures[loop.run_in_executor(pool, _render_chunk, chunk, options, bundle)] = chunk
+            # Keep at most two chunks per worker in flight
+            while len(futures) >= workers * 2:
+                await collect(manifest, writer, futures)
+        while futures:
+            await collect(manifest, writer, futures)
+        if roster_error is not None:
+            counts["roster_error"] = roster_error
 
-    return output_path
+    counts["encode_ms"] = round(counts["encode_ms"], 2)
+    summary = {
+        **counts,
+        "elapsed_s": round(time.perf_counter() - start, 3),
+        "manifest": manifest_path,
+        "failures": failures,
+    }
+    if bundle_path:
+        summary["bundle"] = bundle_path
+        summary["bundle_bytes"] = os.path.getsize(bundle_path)
+    return json.dumps(summary, indent=2)
 
 # -------------------
 # Run MCP Server
 # -------------------
 if __name__ == "__main__":
-    print("Certificate MCP Server is starting...")
-    app.run()
+    # stdout carries the MCP stdio protocol, so log to stderr
+    print("Certificate MCP Server is starting...", file=sys.stderr)
+    mcp_metrics.instrument(app)
+    mcp_transport.run(app)
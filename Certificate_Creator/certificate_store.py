@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Content-addressed certificate output store
+
+Every certificate is stored under a key hashed from everything that
+affects its pixels and bytes: name, course, date, template and font
+identity, layout and encoding options. Rendering the same inputs again is
+a lookup instead of a redraw, and two people who share a name no longer
+overwrite each other.
+
+The index is an append-only JSON Lines file loaded into a dict, so lookups
+are O(1). Bulk workers in other processes append to it as well; a key they
+wrote is still found because its file name is derived from the key.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+INDEX_NAME = "index.jsonl"
+# Files this young are never treated as orphans; a bulk job may still be indexing them
+ORPHAN_GRACE_S = 300
+
+_identities = {}  # path -> ((mtime_ns, size), sha256)
+
+
+def file_identity(path: str) -> str:
+    """SHA-256 of a file's content, recomputed only when its mtime or size changes"""
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _identities.get(path)
+    if cached is None or cached[0] != stamp:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        cached = _identities[path] = (stamp, digest.hexdigest())
+    return cached[1]
+
+
+def make_key(fields: dict) -> str:
+    canonical = json.dumps(fields, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _safe(name: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", name).strip("_")[:60] or "certificate"
+
+
+class CertificateStore:
+    """Output files in ``directory`` plus an append-only index of key -> entry"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX_NAME)
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str, name: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{_safe(name)}_{key[:16]}_certificate.{extension}")
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = {}
+            if os.path.exists(self.index_path):
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue  # torn last line after a crash
+                        entries[entry["key"]] = entry
+            self._entries = entries
+        return self._entries
+
+    def lookup(self, key: str, name: str, extension: str) -> dict | None:
+        """The stored entry for ``key`` if its file still exists"""
+        with self._lock:
+            entry = self._load().get(key)
+            path = entry["path"] if entry else self.path_for(key, name, extension)
+            if not os.path.exists(path):
+                return None
+            if entry is None:
+                # Written by another process since the index was loaded; index it
+                # here too, so gc never mistakes a file just handed out for an orphan
+                entry = {"key": key, "path": path, "bytes": os.path.getsize(path), "created": os.path.getmtime(path)}
+                self._entries[key] = entry
+                self._append(entry)
+            return entry
+
+    def write(self, key: str, name: str, extension: str, data: bytes, meta: dict) -> dict:
+        """Atomically store ``data`` under ``key`` and append it to the index"""
+        path = self.path_for(key, name, extension)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        entry = {"key": key, "path": path, "bytes": len(data), "created": time.time(), **meta}
+        with self._lock:
+            self._load()[key] = entry
+            self._append(entry)
+        return entry
+
+    def _append(self, entry: dict):
+        """Append one index line; the caller holds the lock"""
+        # One write per line keeps appends from concurrent workers whole
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def gc(self, dry_run: bool = False, is_stale=None) -> dict:
+        """
+        Remove orphaned outputs and compact the index.
+
+        Drops index entries whose file is gone and deletes files no index
+        entry points to (unless modified in the last ORPHAN_GRACE_S
+        seconds). When ``is_stale(entry)`` says so, entries rendered from an
+        older template or font are removed together with their files.
+        """
+        with self._lock:
+            self._entries = None  # pick up appends from other processes
+            entries = self._load()
+            missing = {key for key, entry in entries.items() if not os.path.exists(entry["path"])}
+            stale = {
+                key for key, entry in entries.items()
+                if key not in missing and is_stale is not None and is_stale(entry)
+            }
+            keep = {key: entry for key, entry in entries.items() if key not in missing and key not in stale}
+            referenced = {os.path.basename(entry["path"]) for entry in keep.values()}
+            cutoff = time.time() - ORPHAN_GRACE_S
+            orphans = [
+                name for name in os.listdir(self.directory)
+                if name != INDEX_NAME and name not in referenced
+                and os.path.getmtime(os.path.join(self.directory, name)) < cutoff
+            ]
+            freed = sum(os.path.getsize(os.path.join(self.directory, name)) for name in orphans)
+            freed += sum(entries[key].get("bytes", 0) for key in stale)
+            if not dry_run:
+                for key in stale:
+                    try:
+                        os.remove(entries[key]["path"])
+                    except FileNotFoundError:
+                        pass
+                for name in orphans:
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        pass
+                tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    for entry in keep.values():
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                os.replace(tmp_path, self.index_path)
+                self._entries = keep
+            return {
+                "dry_run": dry_run,
+                "kept": len(keep),
+                "dropped_missing": len(missing),
+                "removed_stale": len(stale),
+                "removed_orphans": len(orphans),
+                "freed_bytes": freed,
+            }
@@ -1,83 +1,236 @@
 #!/usr/bin/env python3
 import sys
+import os
+import time
 import asyncio
-from contextlib import AsyncExitStack
+from pathlib import Path
 from mcp.client.session import ClientSession
 from mcp.client.stdio import stdio_client, StdioServerParameters
 
-async def main():
-    # Define both servers
-    paramsA = StdioServerParameters(command=sys.executable, args=["mcp_server_a.py"])
-    paramsB = StdioServerParameters(command=sys.executable, args=["mcp_server_b.py"])
-
-    async with AsyncExitStack() as stack:
-        # Connect to Server A
-        readA, writeA = await stack.enter_async_context(stdio_client(paramsA))
-        sessA = ClientSession(readA, writeA)
-        await stack.enter_async_context(sessA)
-        await sessA.initialize()
-
-        # Connect to Server B
-        readB, writeB = await stack.enter_async_context(stdio_client(paramsB))
-        sessB = ClientSession(readB, writeB)
-        await stack.enter_async_context(sessB)
-        await sessB.initialize()
-
-        print("=== Connected to two MCP servers ===")
-
-        # ---- List prompts on both
-        print("\n[Server A] Prompts:")
-        promptsA = await sessA.list_prompts()
-        for p in promptsA.prompts:
-            desc = getattr(p, "description", "") or ""
-            print(f" - {p.name}" + (f" — {desc}" if desc else ""))
+HERE = Path(__file__).resolve().parent
+
+# Shared catalog cache lives in MCP_Basics/
+sys.path.insert(0, str(HERE.parent))
+from catalog_cache import CatalogCache
+
+# Per-server limits: a slow or dead server is reported, not waited on forever
+CONNECT_TIMEOUT = float(os.getenv("MCP_CONNECT_TIMEOUT", "15"))
+REQUEST_TIMEOUT = float(os.getenv("MCP_REQUEST_TIMEOUT", "10"))
 
-        print("\n[Server B] Prompts:")
-        promptsB = await sessB.list_prompts()
-        for p in promptsB.prompts:
-            desc = getattr(p, "description", "") or ""
-            print(f" - {p.name}" + (f" — {desc}" if desc else ""))
 
-        # ---- Call one prompt on each
-        print("\n[Server A] Calling prompt: greet-user-a")
-        respA = await sessA.get_prompt("greet-user-a", {"name": "Lavanthi"})
+# ---- One server: its transport lives in its own task (anyio needs open/close in one task)
+class ServerConnection:
+    def __init__(self, name: str, params: StdioServerParameters, cache: CatalogCache):
+        self.name = name
+        self.params = params
+        self.catalog = cache.catalog(params)
+        self.session = None
+        self.capabilities = None
+        self._stop = asyncio.Event()
+        self._task = None
+
+    async def start(self, timeout: float):
+        ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run(ready))
         try:
-            print("  ->", respA.messages[0].content.text)
-        except Exception:
-            # Fallbacks for different client structures
-            partsA = getattr(respA, "completion", None) or getattr(respA, "contents", [])
-            for part in partsA:
-                text = getattr(part, "text", None) or str(part)
-                print("  ->", text)
-
-        print("\n[Server B] Calling prompt: greet-user-b")
-        respB = await sessB.get_prompt("greet-user-b", {"name": "Lavanthi"})
+            await asyncio.wait_for(asyncio.shield(ready), timeout)
+        except BaseException:
+            await self.stop()
+            raise
+
+    async def _run(self, ready):
         try:
-            print("  ->", respB.messages[0].content.text)
-        except Exception:
-            partsB = getattr(respB, "completion", None) or getattr(respB, "contents", [])
-            for part in partsB:
-                text = getattr(part, "text", None) or str(part)
-                print("  ->", text)
-
-        # ---- List resources and read one from each
-        print("\n[Server A] Resources:")
-        resA_list = await sessA.list_resources()
-        for r in resA_list.resources:
-            print(f" - {r.name} ({r.uri})")
-        print("Reading resource://hello-a")
-        resA = await sessA.read_resource("resource://hello-a")
-        for c in getattr(resA, "contents", []):
-            print("  ->", getattr(c, "text", None) or str(c))
-
-        print("\n[Server B] Resources:")
-        resB_list = await sessB.list_resources()
-        for r in resB_list.resources:
-            print(f" - {r.name} ({r.uri})")
-        print("Reading resource://time-b")
-        resB = await sessB.read_resource("resource://time-b")
-        for c in getattr(resB, "contents", []):
-            print("  ->", getattr(c, "text", None) or str(c))
+            async with stdio_client(self.params) as (read, write):
+                async with ClientSession(read, write, message_handler=self.catalog.on_message) as session:
+                    init = await session.initialize()
+                    self.catalog.bind(session, init)
+                    self.capabilities = init.capabilities
+                    self.session = session
+                    ready.set_result(None)
+                    await self._stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+        finally:
+            self.session = None
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stop.set()
+        try:
+            await asyncio.wait_for(self._task, 5)
+        except (Exception, asyncio.TimeoutError):
+            self._task.cancel()
+        self._task = None
+
+
+# ---- N servers: parallel startup, fan-out requests, namespaced catalog
+class MultiServerClient:
+    """
+    Connects to any number of stdio MCP servers at once.
+
+    Startup and every fanned-out request run concurrently with a per-server
+    timeout, so total latency tracks the slowest server, not the sum.
+    Catalog entries are namespaced as ``<server>/<name-or-uri>``; listings
+    come from ``cache`` while fresh, so repeat discovery costs no round-trips.
+    """
+
+    def __init__(self, servers: dict, connect_timeout: float = CONNECT_TIMEOUT,
+                 request_timeout: float = REQUEST_TIMEOUT, cache: CatalogCache | None = None):
+        self.cache = cache or CatalogCache()
+        self.connections = {name: ServerConnection(name, params, self.cache) for name, params in servers.items()}
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        self.errors = {}  # server -> startup error
+
+    async def __aenter__(self):
+        names = list(self.connections)
+        results = await asyncio.gather(
+            *(self.connections[name].start(self.connect_timeout) for name in names),
+            return_exceptions=True,
+        )
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                self.errors[name] = _describe(result)
+                del self.connections[name]
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.gather(*(conn.stop() for conn in self.connections.values()))
+
+    async def fan_out(self, request, servers=None) -> dict:
+        """
+        Run ``request(connection)`` on every (or the given) server concurrently.
+
+        Returns ``{server: result}``; a failed or timed-out server maps to
+        its exception instead of failing the whole call.
+        """
+        conns = [self.connections[name] for name in (servers or self.connections)]
+
+        async def one(conn):
+            return await asyncio.wait_for(request(conn), self.request_timeout)
+
+        results = await asyncio.gather(*(one(conn) for conn in conns), return_exceptions=True)
+        return {conn.name: result for conn, result in zip(conns, results)}
+
+    async def catalog(self) -> dict:
+        """Merged prompts/resources/tools of all servers, keyed ``<server>/<name>``"""
+        async def list_all(conn):
+            caps = conn.capabilities
+            listings = {}
+            if caps.prompts:
+                listings["prompts"] = {p.name: p for p in (await conn.catalog.list_prompts()).prompts}
+            if caps.resources:
+                listings["resources"] = {str(r.uri): r for r in (await conn.catalog.list_resources()).resources}
+            if caps.tools:
+                listings["tools"] = {t.name: t for t in (await conn.catalog.list_tools()).tools}
+            return listings
+
+        merged = {"prompts": {}, "resources": {}, "tools": {}, "errors": {}}
+        for server, listings in (await self.fan_out(list_all)).items():
+            if isinstance(listings, BaseException):
+                merged["errors"][server] = _describe(listings)
+                continue
+            for kind, items in listings.items():
+                for key, item in items.items():
+                    merged[kind][f"{server}/{key}"] = item
+        return merged
+
+    def _route(self, qualified: str):
+        server, _, name = qualified.partition("/")
+        if server not in self.connections or not name:
+            raise KeyError(f"No connected server for '{qualified}'")
+        return self.connections[server].session, name
+
+    async def get_prompt(self, qualified_name: str, arguments: dict | None = None):
+        session, name = self._route(qualified_name)
+        return await asyncio.wait_for(session.get_prompt(name, arguments), self.request_timeout)
+
+    async def read_resource(self, qualified_uri: str):
+        session, uri = self._route(qualified_uri)
+        return await asyncio.wait_for(session.read_resource(uri), self.request_timeout)
+
+    async def gather_requests(self, calls) -> list:
+        """Run ``(method, qualified, *args)`` calls concurrently; results or exceptions in order"""
+        return await asyncio.gather(
+            *(getattr(self, method)(qualified, *args) for method, qualified, *args in calls),
+            return_exceptions=True,
+        )
+
+
+def _describe(error: BaseException) -> str:
+    # The stdio transport wraps failures (e.g. a missing script) in a task group
+    while len(getattr(error, "exceptions", ())) == 1:
+        error = error.exceptions[0]
+    if isinstance(error, asyncio.TimeoutError):
+        return "timed out"
+    return str(error) or error.__class__.__name__
+
+
+def server_params(scripts) -> dict:
+    """Name each server script (server_a, server_b, ...); repeats get a numeric suffix"""
+    servers = {}
+    for script in scripts:
+        base = Path(script).stem.replace("mcp_", "")
+        name, n = base, 1
+        while name in servers:
+            n += 1
+            name = f"{base}-{n}"
+        servers[name] = StdioServerParameters(command=sys.executable, args=[str(HERE / script)], cwd=str(HERE))
+    return servers
+
+
+def prompt_text(resp) -> str:
+    try:
+        return resp.messages[0].content.text
+    except Exception:
+        # Fallbacks for different client structures
+        parts = getattr(resp, "completion", None) or getattr(resp, "contents", [])
+        return " ".join(getattr(part, "text", None) or str(part) for part in parts)
+
+
+async def main():
+    # Servers to connect to; pass script names to override (repeat one to simulate many)
+    scripts = sys.argv[1:] or ["mcp_server_a.py", "mcp_server_b.py"]
+
+    started = time.perf_counter()
+    async with MultiServerClient(server_params(scripts)) as client:
+        print(f"=== Connected to {len(client.connections)} MCP servers "
+              f"in {time.perf_counter() - started:.2f}s ===")
+        for server, error in client.errors.items():
+            print(f" ! {server}: {error}")
+
+        # ---- Catalog from all servers at once
+        started = time.perf_counter()
+        catalog = await client.catalog()
+        print(f"\nCatalog fetched in {time.perf_counter() - started:.2f}s (cache: {client.cache.stats})")
+        print("\nPrompts:")
+        for name, p in catalog["prompts"].items():
+            desc = getattr(p, "description", "") or ""
+            print(f" - {name}" + (f" — {desc}" if desc else ""))
+        print("\nResources:")
+        for uri, r in catalog["resources"].items():
+            print(f" - {r.name} ({uri})")
+
+        # ---- Call every prompt and read every resource concurrently
+        calls = [("get_prompt", name, {"name": "Lavanthi"}) for name in catalog["prompts"]]
+        calls += [("read_resource", uri) for uri in catalog["resources"]]
+        started = time.perf_counter()
+        results = await client.gather_requests(calls)
+        print(f"\n{len(calls)} requests completed in {time.perf_counter() - started:.2f}s")
+        for (method, qualified, *_), result in zip(calls, results):
+            print(f"\n[{qualified}]")
+            if isinstance(result, BaseException):
+                print("  !", _describe(result))
+            elif method == "get_prompt":
+                print("  ->", prompt_text(result))
+            else:
+                for c in getattr(result, "contents", []):
+                    print("  ->", getattr(c, "text", None) or str(c))
+
+        for server, error in catalog["errors"].items():
+            print(f"\n ! {server}: {error}")
 
 if __name__ == "__main__":
     asyncio.run(main())
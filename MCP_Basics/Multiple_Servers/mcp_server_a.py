@@ -1,7 +1,14 @@
 #!/usr/bin/env python3
+import sys
+from pathlib import Path
 from mcp.server.fastmcp import FastMCP
 from mcp.types import Resource
 
+# Shared transport options (stdio or a localhost HTTP/SSE daemon) and request metrics live at the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+import mcp_metrics
+import mcp_transport
+
 mcp = FastMCP("ServerA")
 
 # --- Prompt: greet-user-a
@@ -19,5 +26,7 @@ def hello_resource_a() -> Resource:
     )
 
 if __name__ == "__main__":
-    print("Starting MCP Server A...")
-    mcp.run()
+    # stdout carries the MCP stdio protocol, so log to stderr
+    print("Starting MCP Server A...", file=sys.stderr)
+    mcp_metrics.instrument(mcp)
+    mcp_transport.run(mcp)
@@ -1,8 +1,15 @@
 #!/usr/bin/env python3
+import sys
+from pathlib import Path
 from datetime import datetime
 from mcp.server.fastmcp import FastMCP
 from mcp.types import Resource
 
+# Shared transport options (stdio or a localhost HTTP/SSE daemon) and request metrics live at the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+import mcp_metrics
+import mcp_transport
+
 mcp = FastMCP("ServerB")
 
 # --- Prompt: greet-user-b
@@ -20,5 +27,7 @@ def time_resource_b() -> Resource:
     )
 
 if __name__ == "__main__":
-    print("Starting MCP Server B...")
-    mcp.run()
+    # stdout carries the MCP stdio protocol, so log to stderr
+    print("Starting MCP Server B...", file=sys.stderr)
+    mcp_metrics.instrument(mcp)
+    mcp_transport.run(mcp)
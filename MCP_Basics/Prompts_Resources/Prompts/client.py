@@ -1,9 +1,14 @@
 # mcp_prompt_client.py
 import sys
 import asyncio
+from pathlib import Path
 from mcp.client.session import ClientSession
 from mcp.client.stdio import stdio_client, StdioServerParameters
 
+# Shared catalog cache lives in MCP_Basics/
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from catalog_cache import CatalogCache
+
 async def main():
     # Spawn the server process
     server_params = StdioServerParameters(
@@ -11,13 +16,16 @@ async def main():
         args=["server.py"],  # Server with prompts
     )
 
+    # Prompt catalog is reused across runs until the server changes or the TTL expires
+    catalog = CatalogCache().catalog(server_params)
+
     async with stdio_client(server_params) as (read_stream, write_stream):
-        async with ClientSession(read_stream, write_stream) as session:
+        async with ClientSession(read_stream, write_stream, message_handler=catalog.on_message) as session:
             # Initialize session
-            await session.initialize()
+            catalog.bind(session, await session.initialize())
 
             # List available prompts
-            listed = await session.list_prompts()
+            listed = await catalog.list_prompts()
             print("Available Prompts:")
             for p in listed.prompts:
                 print(f" - {p.name} ({p.description})")
@@ -26,6 +34,7 @@ async def main():
             res = await session.get_prompt("greet-user", {"name": "Lavanthi"})
             print("\nPrompt Response:")
             print(res.messages[0].content.text)
+            print(f"\nCatalog cache: {catalog.cache.stats}")
 
 if __name__ == "__main__":
     asyncio.run(main())
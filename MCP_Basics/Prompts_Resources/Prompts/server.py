@@ -1,6 +1,12 @@
 # mcp_server.py
+import sys
+from pathlib import Path
 from mcp.server.fastmcp import FastMCP
 
+# Shared transport options (stdio or a localhost HTTP/SSE daemon) live at the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+import mcp_transport
+
 # Create the MCP server
 mcp = FastMCP("PromptServer")
 
@@ -13,5 +19,6 @@ async def greet_user_prompt(name: str = "stranger") -> str:
     return f"Hello, {name}! Welcome to the MCP world."
 
 if __name__ == "__main__":
-    print("Starting MCP Prompt Server...")
-    mcp.run()
+    # stdout carries the MCP stdio protocol, so log to stderr
+    print("Starting MCP Prompt Server...", file=sys.stderr)
+    mcp_transport.run(mcp)
@@ -1,10 +1,15 @@
 # mcp_client.py
 import sys
 import asyncio
+from pathlib import Path
 from mcp.client.session import ClientSession
 from mcp.client.stdio import stdio_client
 from mcp.client.stdio import StdioServerParameters
 
+# Shared catalog cache lives in MCP_Basics/
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from catalog_cache import CatalogCache
+
 async def main():
     # Spawn the server process
     server_params = StdioServerParameters(
@@ -12,13 +17,16 @@ async def main():
         args=["mcp_server.py"],
     )
 
+    # Resource catalog is reused across runs until the server changes or the TTL expires
+    catalog = CatalogCache().catalog(server_params)
+
     async with stdio_client(server_params) as (read_stream, write_stream):
-        async with ClientSession(read_stream, write_stream) as session:
+        async with ClientSession(read_stream, write_stream, message_handler=catalog.on_message) as session:
             # Initialize the session
-            await session.initialize()
+            catalog.bind(session, await session.initialize())
             
             # List available resources
-            listed = await session.list_resources()
+            listed = await catalog.list_resources()
             print("Available Resources:")
             for r in listed.resources:
                 print(f" - {r.name} ({r.uri})")
@@ -28,6 +36,7 @@ async def main():
             print("\nResource Content:")
             for c in res.contents:
                 print(c.text)
+            print(f"\nCatalog cache: {catalog.cache.stats}")
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,7 +1,13 @@
 # mcp_server.py
+import sys
+from pathlib import Path
 from mcp.server.fastmcp import FastMCP
 from mcp.types import Resource
 
+# Shared transport options (stdio or a localhost HTTP/SSE daemon) live at the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+import mcp_transport
+
 mcp = FastMCP("SimpleResourceServer")
 
 # Register a single resource
@@ -14,5 +20,6 @@ def hello_resource() -> Resource:
     )
 
 if __name__ == "__main__":
-    print("Starting Simple MCP server...")
-    mcp.run()   # starts stdio server
+    # stdout carries the MCP stdio protocol, so log to stderr
+    print("Starting Simple MCP server...", file=sys.stderr)
+    mcp_transport.run(mcp)   # stdio server, or a shared daemon with --transport http|sse
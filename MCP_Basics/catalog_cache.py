@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Client-side cache for MCP server catalogs (prompts, resources, templates, tools)
+
+Catalogs are keyed by server identity: the name and version the server
+reports at initialize, plus the launch command and the modification time
+of the server script, so editing a server invalidates its entries. An
+entry is dropped when the server sends ``notifications/*/list_changed``
+or after MCP_CATALOG_TTL seconds. The cache is a JSON file, so repeat
+discovery after a restart costs no round-trips.
+
+Usage:
+    cache = CatalogCache()
+    catalog = cache.catalog(server_params)
+    async with ClientSession(read, write, message_handler=catalog.on_message) as session:
+        catalog.bind(session, await session.initialize())
+        listed = await catalog.list_prompts()
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import anyio
+from mcp import types
+
+CATALOG_CACHE_PATH = os.getenv("MCP_CATALOG_CACHE", os.path.expanduser("~/.cache/mcp_basics/catalog.json"))
+CATALOG_TTL = float(os.getenv("MCP_CATALOG_TTL", "600"))
+
+# Catalog kind -> (ClientSession method, result model)
+KINDS = {
+    "prompts": ("list_prompts", types.ListPromptsResult),
+    "resources": ("list_resources", types.ListResourcesResult),
+    "resource_templates": ("list_resource_templates", types.ListResourceTemplatesResult),
+    "tools": ("list_tools", types.ListToolsResult),
+}
+
+# list_changed notification -> catalog kinds it invalidates
+_LIST_CHANGED = {
+    types.PromptListChangedNotification: ("prompts",),
+    types.ResourceListChangedNotification: ("resources", "resource_templates"),
+    types.ToolListChangedNotification: ("tools",),
+}
+
+
+def server_key(init: types.InitializeResult, params=None) -> str:
+    """Identity of a server: reported name/version, launch command and script mtime"""
+    identity = {
+        "name": init.serverInfo.name,
+        "version": init.serverInfo.version,
+        "protocol": init.protocolVersion,
+    }
+    if params is not None:
+        identity["command"] = [params.command, *params.args]
+        identity["cwd"] = str(params.cwd or "")
+        scripts = [os.path.join(str(params.cwd or ""), a) for a in params.args]
+        identity["mtimes"] = [os.stat(s).st_mtime_ns for s in scripts if os.path.isfile(s)]
+    canonical = json.dumps(identity, sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+class CatalogCache:
+    """Catalog entries of many servers, in memory and persisted to ``path``"""
+
+    def __init__(self, path: str | None = CATALOG_CACHE_PATH, ttl: float = CATALOG_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        self._entries = self._read()  # server key -> {kind: {"fetched": ts, "result": json}}
+
+    def _read(self) -> dict:
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, key: str):
+        if not self.path:
+            return
+        # Merge with what other processes wrote since we loaded; only this server's entry is ours
+        entries = self._read()
+        if self._entries.get(key):
+            entries[key] = self._entries[key]
+        else:
+            entries.pop(key, None)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str, kind: str):
+        entry = self._entries.get(key, {}).get(kind)
+        if entry is None or time.time() - entry["fetched"] > self.ttl:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return KINDS[kind][1].model_validate(entry["result"])
+
+    def put(self, key: str, kind: str, result):
+        self._entries.setdefault(key, {})[kind] = {
+            "fetched": time.time(),
+            "result": result.model_dump(mode="json", by_alias=True, exclude_none=True),
+        }
+        self._save(key)
+
+    def invalidate(self, key: str, kinds=None):
+        entry = self._entries.get(key)
+        if not entry:
+            return
+        for kind in kinds or list(entry):
+            if entry.pop(kind, None) is not None:
+                self.stats["invalidations"] += 1
+        self._save(key)
+
+    def catalog(self, params=None) -> "ServerCatalog":
+        """A catalog view for one server session launched with ``params``"""
+        return ServerCatalog(self, params)
+
+
+class ServerCatalog:
+    """One server's catalog, served from the cache while it is fresh"""
+
+    def __init__(self, cache: CatalogCache, params=None):
+        self.cache = cache
+        self.params = params
+        self.session = None
+        self.key = None
+
+    def bind(self, session, init: types.InitializeResult):
+        """Attach the initialized session; its InitializeResult identifies the server"""
+        self.session = session
+        self.key = server_key(init, self.params)
+
+    async def on_message(self, message):
+        """ClientSession message_handler: drop catalog kinds the server says have changed"""
+        if isinstance(message, types.ServerNotification):
+            kinds = _LIST_CHANGED.get(type(message.root))
+            if kinds and self.key:
+                self.cache.invalidate(self.key, kinds)
+        await anyio.lowlevel.checkpoint()
+
+    async def _list(self, kind: str):
+        result = self.cache.get(self.key, kind)
+        if result is None:
+            method = KINDS[kind][0]
+            result = await getattr(self.session, method)()
+            self.cache.put(self.key, kind, result)
+        return result
+
+    async def list_prompts(self) -> types.ListPromptsResult:
+        return await self._list("prompts")
+
+    async def list_resources(self) -> types.ListResourcesResult:
+        return await self._list("resources")
+
+    async def list_resource_templates(self) -> types.ListResourceTemplatesResult:
+        return await self._list("resource_templates")
+
+    async def list_tools(self) -> types.ListToolsResult:
+        return await self._list("tools")
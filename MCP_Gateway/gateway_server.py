@@ -0,0 +1,482 @@
+# gateway/gateway_server.py
+"""
+MCP gateway: one FastMCP server in front of the repo's MCP servers.
+
+Each downstream server runs as one or more long-lived stdio subprocesses.
+Their prompts, tools and resources are re-exported under namespaced names,
+every call goes to the least-busy instance, and an instance that crashes
+or hangs is restarted. Clients pay one handshake (to the gateway) instead of one
+per server per run.
+
+Backends are started once per gateway process, in the background, when
+the first session opens; later sessions share them. Run the gateway as a
+shared daemon (``--transport http``, see mcp_transport.py at the repo
+root) so every client reuses the same warm backends.
+
+Namespacing:
+    tools, prompts   <backend>__<name>          e.g. certificate__create_certificate
+    resources        gateway://<backend>/<uri>  e.g. gateway://server_a/resource://hello-a
+"""
+
+import asyncio
+import base64
+import json
+import os
+import sys
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from pathlib import Path
+
+import httpx
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
+from mcp.server.fastmcp import FastMCP
+from mcp.server.lowlevel.helper_types import ReadResourceContents
+from mcp.types import CONNECTION_CLOSED, BlobResourceContents, Prompt, Resource, ResourceTemplate, Tool
+from pydantic import AnyUrl
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Shared transport options (stdio or a localhost HTTP/SSE daemon) live at the repo root
+sys.path.insert(0, str(REPO_ROOT))
+import mcp_transport
+
+# Downstream servers: backend name -> script (run with its own folder as cwd)
+BACKENDS = {
+    "server_a": REPO_ROOT / "MCP_Basics" / "Multiple_Servers" / "mcp_server_a.py",
+    "server_b": REPO_ROOT / "MCP_Basics" / "Multiple_Servers" / "mcp_server_b.py",
+    "ocr": REPO_ROOT / "OCR_Usecase" / "working_ocr_server.py",
+    "certificate": REPO_ROOT / "Certificate_Creator" / "certificate_server.py",
+}
+
+# Settings (override via environment)
+# GATEWAY_BACKENDS: comma-separated subset of BACKENDS (default: all)
+# GATEWAY_INSTANCES: instances per backend, "2" or per backend "ocr=2,certificate=3"
+GATEWAY_TIMEOUT = float(os.getenv("GATEWAY_TIMEOUT", "300"))
+GATEWAY_RETRIES = int(os.getenv("GATEWAY_RETRIES", "1"))
+# Seconds a timed-out instance gets to answer a ping before it counts as hung
+GATEWAY_PING_TIMEOUT = float(os.getenv("GATEWAY_PING_TIMEOUT", "10"))
+# Seconds before a backend that failed to start is tried again (doubling up to 10 min; 0 = never)
+GATEWAY_START_RETRY_S = float(os.getenv("GATEWAY_START_RETRY_S", "30"))
+
+SEPARATOR = "__"
+RESOURCE_SCHEME = "gateway://"
+
+# McpError codes the client session raises for a hung or dead backend
+# (as opposed to errors the backend itself answered with)
+TIMED_OUT = httpx.codes.REQUEST_TIMEOUT
+
+
+def describe(error: BaseException) -> str:
+    """Readable message for an error, unwrapping the task groups of the stdio client"""
+    while isinstance(error, BaseExceptionGroup) and error.exceptions:
+        error = error.exceptions[0]
+    return str(error) or error.__class__.__name__
+
+
+def backend_instances() -> dict:
+    """Backend name -> instance count, from GATEWAY_BACKENDS and GATEWAY_INSTANCES"""
+    names = [n.strip() for n in os.getenv("GATEWAY_BACKENDS", ",".join(BACKENDS)).split(",") if n.strip()]
+    unknown = [n for n in names if n not in BACKENDS]
+    if unknown:
+        raise ValueError(f"Unknown backend(s) {', '.join(unknown)} (use {', '.join(BACKENDS)})")
+    setting = os.getenv("GATEWAY_INSTANCES", "1").strip()
+    counts = dict.fromkeys(names, 1)
+    if "=" in setting:
+        for item in setting.split(","):
+            name, _, count = item.partition("=")
+            if name.strip() in counts:
+                counts[name.strip()] = max(1, int(count))
+    else:
+        counts = dict.fromkeys(names, max(1, int(setting)))
+    return counts
+
+
+# -------------------
+# One downstream server subprocess
+# -------------------
+class BackendInstance:
+    """
+    A downstream server subprocess with an initialized MCP session.
+
+    The stdio transport is opened and closed inside one background task,
+    as anyio requires; requests are sent from any task.
+    """
+
+    def __init__(self, backend: str, index: int, script: Path):
+        self.backend = backend
+        self.index = index
+        self.script = script
+        self.outstanding = 0
+        self.restarts = 0
+        self.session = None
+        self.capabilities = None
+        self._stop = None
+        self._task = None
+
+    def params(self) -> StdioServerParameters:
+        return StdioServerParameters(
+            command=sys.executable,
+            args=[str(self.script)],
+            cwd=str(self.script.parent),
+            env=dict(os.environ),
+        )
+
+    async def start(self):
+        self._stop = asyncio.Event()
+        ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run(ready))
+        await ready
+
+    async def _run(self, ready):
+        try:
+            async with stdio_client(self.params()) as (read, write):
+                # Every request gets a deadline, so a hung instance is noticed and recycled
+                async with ClientSession(read, write,
+                                         read_timeout_seconds=timedelta(seconds=GATEWAY_TIMEOUT)) as session:
+                    init = await session.initialize()
+                    self.capabilities = init.capabilities
+                    self.session = session
+                    ready.set_result(None)
+                    await self._stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+        finally:
+            self.session = None
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stop.set()
+        try:
+            await asyncio.wait_for(self._task, 10)
+        except (Exception, asyncio.TimeoutError):
+            self._task.cancel()
+        self._task = None
+
+    async def restart(self):
+        await self.stop()
+        self.restarts += 1
+        await self.start()
+
+    async def healthy(self) -> bool:
+        """Whether the instance still answers a ping within GATEWAY_PING_TIMEOUT"""
+        if self.session is None:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), GATEWAY_PING_TIMEOUT)
+        except Exception:
+            return False
+        return True
+
+
+# -------------------
+# Instances of one backend with least-outstanding-requests routing
+# -------------------
+class BackendPool:
+    def __init__(self, name: str, script: Path, size: int):
+        self.name = name
+        self.instances = [BackendInstance(name, i, script) for i in range(size)]
+        self.calls = 0
+        self.failures = 0
+        self._restarting = {}
+
+    async def start(self):
+        await asyncio.gather(*(instance.start() for instance in self.instances))
+
+    async def stop(self):
+        await asyncio.gather(*(instance.stop() for instance in self.instances))
+
+    @property
+    def capabilities(self):
+        return self.instances[0].capabilities
+
+    @property
+    def restarts(self) -> int:
+        return sum(instance.restarts for instance in self.instances)
+
+    def _pick(self) -> BackendInstance:
+        live = [i for i in self.instances if i.session is not None and i.index not in self._restarting]
+        return min(live or self.instances, key=lambda i: i.outstanding)
+
+    async def _restart(self, instance: BackendInstance):
+        # Concurrent failures on the same instance share one restart
+        task = self._restarting.get(instance.index)
+        if task is None:
+            task = self._restarting[instance.index] = asyncio.create_task(instance.restart())
+            task.add_done_callback(lambda _: self._restarting.pop(instance.index, None))
+        await task
+
+    async def request(self, method: str, *args, **kwargs):
+        """
+        Call ``ClientSession.<method>`` on the least-busy instance.
+
+        A crashed instance (closed connection or broken pipe) is restarted
+        and the request retried on the least-busy one, up to
+        GATEWAY_RETRIES times. A request that gets no answer within
+        GATEWAY_TIMEOUT fails without a retry (it already had its full
+        time); its instance is restarted only if it does not answer a ping
+        either, so other requests in flight on a slow but healthy instance
+        keep running. Errors the backend itself reports are passed through.
+        """
+        self.calls += 1
+        for attempt in range(GATEWAY_RETRIES + 1):
+            instance = self._pick()
+            if instance.session is None:
+                await self._restart(instance)
+            instance.outstanding += 1
+            try:
+                return await getattr(instance.session, method)(*args, **kwargs)
+            except McpError as e:
+                if e.error.code == TIMED_OUT:
+                    self.failures += 1
+                    if not await instance.healthy():
+                        await self._restart(instance)
+                    raise
+                if e.error.code != CONNECTION_CLOSED:
+                    raise  # the backend answered with an error; it is alive
+                if attempt == GATEWAY_RETRIES:
+                    self.failures += 1
+                    raise
+                await self._restart(instance)
+            except Exception:
+                if attempt == GATEWAY_RETRIES:
+                    self.failures += 1
+                    raise
+                await self._restart(instance)
+            finally:
+                instance.outstanding -= 1
+
+    def status(self) -> dict:
+        return {
+            "instances": [
+                {"index": i.index, "alive": i.session is not None, "outstanding": i.outstanding,
+                 "restarts": i.restarts}
+                for i in self.instances
+            ],
+            "calls": self.calls,
+            "failures": self.failures,
+        }
+
+
+# -------------------
+# Gateway server
+# -------------------
+class Gateway(FastMCP):
+    """
+    FastMCP server whose catalog is its own tools plus every backend's.
+
+    Backends are started and their catalogs listed once per process, not
+    per session: the first session starts them in the background and
+    every session waits for them only when it first lists or forwards
+    something. A backend's catalog is listed again after one of its
+    instances restarts, and a backend that failed to start is retried in
+    the background. Calls are forwarded to the backend pools by namespace.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name, lifespan=self._lifespan)
+        self.pools = {}
+        self.errors = {}  # backend -> startup error
+        self.catalogs = {}  # backend -> {"tools", "prompts", "resources", "templates"}
+        self._catalog_restarts = {}  # backend -> pool restart count its catalog was listed at
+        self._starting = None
+        self._retries = set()
+
+    @property
+    def catalog(self) -> dict:
+        """Every backend's catalog entries merged, by kind"""
+        merged = {"tools": [], "prompts": [], "resources": [], "templates": []}
+        for catalog in self.catalogs.values():
+            for kind, items in catalog.items():
+                merged[kind].extend(items)
+        return merged
+
+    @asynccontextmanager
+    async def _lifespan(self, _server):
+        # Runs per session; the backends outlive it and are shared by later sessions.
+        # Their tasks are cancelled, and the subprocesses stopped, when the process exits.
+        if self._starting is None:
+            self._starting = asyncio.ensure_future(self.start_backends())
+        yield
+
+    async def ready(self):
+        """Wait until the backends are started and their catalogs listed"""
+        if self._starting is None:
+            self._starting = asyncio.ensure_future(self.start_backends())
+        await asyncio.shield(self._starting)
+
+    async def start_backends(self):
+        counts = backend_instances()
+        pools = {name: BackendPool(name, BACKENDS[name], count) for name, count in counts.items()}
+        results = await asyncio.gather(*(pool.start() for pool in pools.values()), return_exceptions=True)
+        for (name, pool), result in zip(pools.items(), results):
+            if isinstance(result, BaseException):
+                self.errors[name] = describe(result)
+                await pool.stop()
+                print(f"Gateway: backend '{name}' failed to start: {self.errors[name]}", file=sys.stderr)
+                if GATEWAY_START_RETRY_S > 0:
+                    retry = asyncio.ensure_future(self._retry_backend(name, counts[name]))
+                    self._retries.add(retry)
+                    retry.add_done_callback(self._retries.discard)
+            else:
+                self.pools[name] = pool
+        await self._refresh_catalogs()
+
+    async def _retry_backend(self, name: str, count: int):
+        """Start a backend that failed to start, with a doubling delay between attempts"""
+        delay = GATEWAY_START_RETRY_S
+        while True:
+            await asyncio.sleep(delay)
+            pool = BackendPool(name, BACKENDS[name], count)
+            try:
+                await pool.start()
+            except Exception as e:
+                await pool.stop()
+                self.errors[name] = describe(e)
+                delay = min(delay * 2, 600)
+                print(f"Gateway: backend '{name}' failed to start again: {self.errors[name]} "
+                      f"(next try in {delay:g}s)", file=sys.stderr)
+                continue
+            self.pools[name] = pool
+            self.errors.pop(name, None)
+            print(f"Gateway: backend '{name}' started", file=sys.stderr)
+            await self._refresh_catalogs()
+            return
+
+    async def _refresh_catalogs(self):
+        """List the catalog of every backend not listed since its last restart (or ever)"""
+        stale = {name: pool for name, pool in self.pools.items() if self._catalog_restarts.get(name) != pool.restarts}
+        results = await asyncio.gather(
+            *(self._load_catalog(name, pool) for name, pool in stale.items()), return_exceptions=True
+        )
+        for name, result in zip(stale, results):
+            if isinstance(result, BaseException):
+                # Left stale, so the next listing tries again
+                print(f"Gateway: backend '{name}' catalog failed: {result}", file=sys.stderr)
+
+    async def _load_catalog(self, name: str, pool: BackendPool):
+        restarts = pool.restarts
+        caps = pool.capabilities
+        catalog = {"tools": [], "prompts": [], "resources": [], "templates": []}
+        if caps.tools:
+            for tool in (await pool.request("list_tools")).tools:
+                catalog["tools"].append(tool.model_copy(update={"name": f"{name}{SEPARATOR}{tool.name}"}))
+        if caps.prompts:
+            for prompt in (await pool.request("list_prompts")).prompts:
+                catalog["prompts"].append(prompt.model_copy(update={"name": f"{name}{SEPARATOR}{prompt.name}"}))
+        if caps.resources:
+            for res in (await pool.request("list_resources")).resources:
+                uri = AnyUrl(f"{RESOURCE_SCHEME}{name}/{res.uri}")
+                catalog["resources"].append(res.model_copy(update={"uri": uri}))
+            try:
+                templates = (await pool.request("list_resource_templates")).resourceTemplates
+            except McpError:
+                templates = []  # low-level servers may serve resources without templates
+            for tpl in templates:
+                catalog["templates"].append(
+                    tpl.model_copy(update={"uriTemplate": f"{RESOURCE_SCHEME}{name}/{tpl.uriTemplate}"})
+                )
+        self.catalogs[name] = catalog
+        self._catalog_restarts[name] = restarts
+
+    def _route(self, qualified: str):
+        backend, sep, name = qualified.partition(SEPARATOR)
+        if sep and backend in self.errors and backend not in self.pools:
+            raise ValueError(f"Backend '{backend}' is not available: {self.errors[backend]}")
+        if not sep or backend not in self.pools:
+            return None, qualified
+        return self.pools[backend], name
+
+    # ---- Catalog: gateway's own entries plus the backends'
+    async def list_tools(self) -> list[Tool]:
+        await self.ready()
+        await self._refresh_catalogs()
+        return await super().list_tools() + self.catalog["tools"]
+
+    async def list_prompts(self) -> list[Prompt]:
+        await self.ready()
+        await self._refresh_catalogs()
+        return await super().list_prompts() + self.catalog["prompts"]
+
+    async def list_resources(self) -> list[Resource]:
+        await self.ready()
+        await self._refresh_catalogs()
+        return await super().list_resources() + self.catalog["resources"]
+
+    async def list_resource_templates(self) -> list[ResourceTemplate]:
+        await self.ready()
+        await self._refresh_catalogs()
+        return await super().list_resource_templates() + self.catalog["templates"]
+
+    # ---- Forwarding
+    async def call_tool(self, name: str, arguments: dict):
+        await self.ready()
+        pool, tool = self._route(name)
+        if pool is None:
+            return await super().call_tool(name, arguments)
+
+        # Relay the backend's progress notifications to the caller under the caller's token
+        ctx = self.get_context()
+        meta = ctx.request_context.meta
+        progress_token = meta.progressToken if meta else None
+        forward_progress = None
+        if progress_token is not None:
+            async def forward_progress(progress, total, message):
+                await ctx.session.send_progress_notification(
+                    progress_token, progress, total, message=message, related_request_id=ctx.request_id,
+                )
+
+        # The backend's CallToolResult (content, structuredContent, isError) is returned as is
+        return await pool.request("call_tool", tool, arguments, progress_callback=forward_progress)
+
+    async def get_prompt(self, name: str, arguments: dict | None = None):
+        await self.ready()
+        pool, prompt = self._route(name)
+        if pool is None:
+            return await super().get_prompt(name, arguments)
+        return await pool.request("get_prompt", prompt, arguments)
+
+    async def read_resource(self, uri):
+        uri = str(uri)
+        if not uri.startswith(RESOURCE_SCHEME):
+            return await super().read_resource(uri)
+        await self.ready()
+        backend, _, inner = uri[len(RESOURCE_SCHEME):].partition("/")
+        if backend in self.errors and backend not in self.pools:
+            raise ValueError(f"Backend '{backend}' is not available: {self.errors[backend]}")
+        if backend not in self.pools:
+            raise ValueError(f"Unknown gateway backend '{backend}'")
+        result = await self.pools[backend].request("read_resource", inner)
+        return [
+            ReadResourceContents(
+                content=base64.b64decode(c.blob) if isinstance(c, BlobResourceContents) else c.text,
+                mime_type=c.mimeType,
+                meta=c.meta,
+            )
+            for c in result.contents
+        ]
+
+
+app = Gateway("mcp-gateway")
+
+
+@app.tool("gateway_status")
+def gateway_status() -> str:
+    """Backends, their instances (alive, outstanding requests, restarts) and call counts"""
+    return json.dumps({
+        "backends": {name: pool.status() for name, pool in app.pools.items()},
+        "failed_to_start": app.errors,
+        "catalog": {kind: len(items) for kind, items in app.catalog.items()},
+    }, indent=2)
+
+
+# -------------------
+# Run Gateway
+# -------------------
+if __name__ == "__main__":
+    # stdout carries the MCP stdio protocol, so log to stderr
+    print("MCP Gateway is starting...", file=sys.stderr)
+    mcp_transport.run(app)
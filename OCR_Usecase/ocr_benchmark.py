@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Throughput and latency benchmark for the MCP OCR server
+
+Builds a synthetic corpus of text images with PIL, drives
+working_ocr_server.py over real MCP stdio sessions and reports
+images/sec, latency percentiles, startup time and peak RSS.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from PIL import Image, ImageDraw, ImageFont
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SERVER_SCRIPT = Path(__file__).resolve().parent / "working_ocr_server.py"
+
+WORDS = (
+    "invoice total amount due payment received customer account number date "
+    "quantity description unit price tax subtotal balance shipping order reference"
+).split()
+
+
+# --------------------------
+# Synthetic corpus
+# --------------------------
+def _font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 has no scalable default font
+        return ImageFont.load_default()
+
+
+def build_corpus(directory: Path, sizes, line_counts, images_per_combo: int) -> list[Path]:
+    """Render ``images_per_combo`` text images for every (size, line count) pair"""
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for width, height in sizes:
+        for lines in line_counts:
+            line_height = max(12, height // (lines + 2))
+            font = _font(max(10, int(line_height * 0.6)))
+            for n in range(images_per_combo):
+                path = directory / f"synthetic_{width}x{height}_{lines}l_{n}.png"
+                if not path.exists():
+                    image = Image.new("L", (width, height), 255)
+                    draw = ImageDraw.Draw(image)
+                    for i in range(lines):
+                        words = [WORDS[(n * 7 + i * 3 + j) % len(WORDS)] for j in range(12)]
+                        draw.text((line_height, line_height * (i + 1)), " ".join(words), font=font, fill=0)
+                    image.save(path)
+                paths.append(path)
+    return paths
+
+
+# --------------------------
+# Measurement helpers
+# --------------------------
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def children_peak_rss_mb() -> float | None:
+    """Largest peak RSS of any finished child process (server or pool worker)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def server_params(args) -> StdioServerParameters:
+    env = dict(os.environ)
+    env["OCR_CACHE"] = "1" if args.cache else "0"
+    if args.mock:
+        env["OCR_MOCK"] = "1"
+    if args.workers:
+        env["OCR_WORKERS"] = str(args.workers)
+    env["OCR_WARMUP"] = "1" if args.prewarm else "0"
+    return StdioServerParameters(
+        command=sys.executable,
+        args=[str(SERVER_SCRIPT)],
+        cwd=str(SERVER_SCRIPT.parent),
+        env=env,
+    )
+
+
+# --------------------------
+# Benchmark run
+# --------------------------
+async def run_benchmark(paths: list[Path], args) -> dict:
+    queue = asyncio.Queue()
+    for _ in range(args.repeat):
+        for path in paths:
+            queue.put_nowait(str(path))
+    latencies = []
+    failures = 0
+    startups = []
+    first_result = []
+    server_startup = {}
+    run_start = time.perf_counter()
+
+    async def pump(session: ClientSession):
+        nonlocal failures
+        while True:
+            try:
+                image_path = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                result = await session.call_tool("perform_ocr", {"image_path": image_path})
+                if result.isError or result.content[0].text.startswith("Error"):
+                    failures += 1
+            except Exception:
+                failures += 1
+            end = time.perf_counter()
+            latencies.append(end - start)
+            if not first_result:
+                first_result.append(end - run_start)
+
+    async def run_session():
+        spawn = time.perf_counter()
+        async with stdio_client(server_params(args)) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                startups.append(time.perf_counter() - spawn)
+                for _ in range(args.warmup):
+                    await session.call_tool("perform_ocr", {"image_path": str(paths[0])})
+                    if not first_result:
+                        first_result.append(time.perf_counter() - run_start)
+                await asyncio.gather(*(pump(session) for _ in range(args.concurrency)))
+                if not server_startup:
+                    report = await session.call_tool("ocr_startup", {})
+                    server_startup.update(json.loads(report.content[0].text))
+
+    await asyncio.gather(*(run_session() for _ in range(args.sessions)))
+    elapsed = time.perf_counter() - run_start
+
+    ordered = sorted(latencies)
+
+    def ms(seconds: float) -> float:
+        return round(seconds * 1000, 2)
+
+    return {
+        "images": len(latencies),
+        "failures": failures,
+        "elapsed_s": round(elapsed, 3),
+        "images_per_sec": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+            "p50": ms(percentile(ordered, 50)),
+            "p95": ms(percentile(ordered, 95)),
+            "p99": ms(percentile(ordered, 99)),
+            "max": ms(ordered[-1]) if ordered else 0.0,
+        },
+        "startup_ms": {
+            "mean": ms(sum(startups) / len(startups)) if startups else 0.0,
+            "max": ms(max(startups)) if startups else 0.0,
+        },
+        "time_to_first_result_ms": ms(first_result[0]) if first_result else None,
+        "peak_rss_mb": children_peak_rss_mb(),
+        "server_startup": server_startup,
+    }
+
+
+def parse_sizes(value: str) -> list[tuple[int, int]]:
+    sizes = []
+    for item in value.split(","):
+        width, _, height = item.lower().partition("x")
+        sizes.append((int(width), int(height)))
+    return sizes
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the MCP OCR server over stdio sessions",
+        usage="python ocr_benchmark.py [--sizes 800x600,2480x3508] [--lines 5,40] [--sessions N] "
+              "[--concurrency N] [--mock] [--json results.json]",
+    )
+    parser.add_argument("--sizes", default="800x600,1700x2200,2480x3508",
+                        help="Comma-separated WIDTHxHEIGHT image sizes (default: 800x600,1700x2200,2480x3508)")
+    parser.add_argument("--lines", default="5,40",
+                        help="Comma-separated text lines per image, i.e. densities (default: 5,40)")
+    parser.add_argument("--images", type=int, default=4, help="Images per size/density combination (default: 4)")
+    parser.add_argument("--repeat", type=int, default=1, help="Times to OCR the whole corpus (default: 1)")
+    parser.add_argument("--corpus-dir", help="Where to keep the synthetic corpus (default: a temporary directory)")
+    parser.add_argument("--sessions", type=int, default=1, help="Concurrent server sessions (default: 1)")
+    parser.add_argument("--concurrency", type=int, default=4, help="In-flight requests per session (default: 4)")
+    parser.add_argument("--workers", type=int, help="OCR_WORKERS for the server (default: server default)")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed calls per session before measuring (default: 1)")
+    parser.add_argument("--prewarm", action="store_true",
+                        help="Start the server with OCR_WARMUP=1 (background pool and tesseract warm-up)")
+    parser.add_argument("--cache", action="store_true", help="Leave the server's result cache enabled")
+    parser.add_argument("--mock", action="store_true",
+                        help="Force the server's mock OCR path to measure transport overhead only")
+    parser.add_argument("--json", dest="json_out", help="Write results as JSON to this path")
+    parser.add_argument("--label", help="Free-form label stored in the JSON results")
+    args = parser.parse_args()
+
+    sizes = parse_sizes(args.sizes)
+    line_counts = [int(n) for n in args.lines.split(",")]
+
+    with tempfile.TemporaryDirectory(prefix="ocr_bench_") as tmp:
+        corpus_dir = Path(args.corpus_dir) if args.corpus_dir else Path(tmp)
+        print(f" Building corpus in {corpus_dir} ...")
+        paths = build_corpus(corpus_dir, sizes, line_counts, args.images)
+        print(f" Running {len(paths) * args.repeat} OCR calls over {args.sessions} session(s), "
+              f"{args.concurrency} in flight each{' (mock OCR)' if args.mock else ''}")
+        results = await run_benchmark(paths, args)
+
+    print("\n Benchmark Results:")
+    print("=" * 50)
+    print(f" Images:        {results['images']} ({results['failures']} failed)")
+    print(f" Throughput:    {results['images_per_sec']} images/sec")
+    latency = results["latency_ms"]
+    print(f" Latency (ms):  p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}")
+    print(f" Startup (ms):  mean {results['startup_ms']['mean']}  max {results['startup_ms']['max']}")
+    print(f" First result:  {results['time_to_first_result_ms']} ms")
+    startup = results["server_startup"]
+    if startup:
+        print(f" Server startup: core imports {startup.get('core_imports_ms')} ms, "
+              f"OCR imports {startup.get('ocr_imports_ms')} ms, "
+              f"first request at {startup.get('first_request_ms')} ms")
+    if results["peak_rss_mb"] is not None:
+        print(f" Peak RSS:      {results['peak_rss_mb']} MB (largest server/worker process)")
+    print("=" * 50)
+
+    if args.json_out:
+        report = {
+            "label": args.label,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "config": {
+                "sizes": args.sizes,
+                "lines": args.lines,
+                "images": len(paths),
+                "repeat": args.repeat,
+                "sessions": args.sessions,
+                "concurrency": args.concurrency,
+                "workers": args.workers,
+                "warmup": args.warmup,
+                "cache": args.cache,
+                "prewarm": args.prewarm,
+                "mock": args.mock,
+            },
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+            },
+            "results": results,
+        }
+        out_path = Path(args.json_out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f" Saved results to: {out_path}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
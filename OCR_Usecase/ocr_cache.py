@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for OCR results
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """
+    Stores OCR text on disk keyed by image content and OCR settings.
+
+    Entries are evicted least-recently-used first once the total size
+    exceeds ``max_bytes``. File mtimes record recency so the LRU order
+    survives server restarts. Methods do blocking disk I/O; the server
+    calls them from worker threads, so the index is guarded by a lock.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> size in bytes, oldest first
+        self._size = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def make_key(image_digest: str, settings: dict) -> str:
+        """Combine the image digest with the OCR settings into a cache key"""
+        blob = image_digest + json.dumps(settings, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.txt"
+
+    def _load(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for p in self.directory.glob("*.txt"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, p.stem, st.st_size))
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._size += size
+        self._evict()
+
+    def get(self, key: str) -> str | None:
+        """Return cached text for ``key`` or None on a miss"""
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key: str) -> str | None:
+        if key in self._entries:
+            path = self._path(key)
+            try:
+                text = path.read_text(encoding="utf-8")
+                os.utime(path)
+            except OSError:
+                self._drop(key)
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return text
+        self.misses += 1
+        return None
+
+    def put(self, key: str, text: str):
+        """Store ``text`` under ``key`` and evict old entries if over the cap"""
+        with self._lock:
+            self._put(key, text)
+
+    def _put(self, key: str, text: str):
+        data = text.encode("utf-8")
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        if key in self._entries:
+            self._size -= self._entries.pop(key)
+        self._entries[key] = len(data)
+        self._size += len(data)
+        self._evict()
+
+    def _drop(self, key: str):
+        self._size -= self._entries.pop(key, 0)
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._drop(key)
+            self.evictions += 1
+
+    def purge(self, key: str | None = None) -> int:
+        """Remove one entry (or all entries when ``key`` is None); return count removed"""
+        with self._lock:
+            keys = list(self._entries) if key is None else [key] if key in self._entries else []
+            for k in keys:
+                self._drop(k)
+            return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return self._stats()
+
+    def _stats(self) -> dict:
+        return {
+            "directory": str(self.directory),
+            "entries": len(self._entries),
+            "size_bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -2,62 +2,321 @@
 
 
 import asyncio
+import base64
+import glob
+import os
 import sys
 import argparse
+import time
 from pathlib import Path
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
-async def perform_ocr(image_path: str) -> str:
+# Optional: Pillow tells multi-page TIFFs from single-page ones
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".gif", ".webp"}
+TIFF_EXTENSIONS = {".tif", ".tiff"}
+
+
+def is_document(path: Path) -> bool:
+    """True for PDFs and multi-page TIFFs, which are OCR'd page by page"""
+    suffix = path.suffix.lower()
+    if suffix == ".pdf":
+        return True
+    if suffix not in TIFF_EXTENSIONS or not HAS_PIL:
+        return False
+    try:
+        with Image.open(path) as image:
+            return getattr(image, "n_frames", 1) > 1
+    except OSError:
+        return False
+
+def server_params() -> StdioServerParameters:
+    """Parameters for spawning the local OCR server"""
+    return StdioServerParameters(
+        command="python",
+        args=["working_ocr_server.py"]
+    )
+
+def ocr_arguments(image_path: str, inline: bool = False) -> dict:
+    """perform_ocr arguments; ``inline`` sends the image bytes instead of the path"""
+    if not inline:
+        return {"image_path": image_path}
+    return {
+        "image_data": base64.b64encode(Path(image_path).read_bytes()).decode("ascii"),
+        "name": Path(image_path).name,
+    }
+
+async def perform_ocr(image_path: str, inline: bool = False) -> str:
     """
     Perform OCR on an image using the MCP OCR server
-    
+
     Args:
         image_path: Path to the image file
-        
+        inline: Send the image bytes so the server needs no access to the file
+
     Returns:
         Extracted text from the image
     """
-    server_params = StdioServerParameters(
-        command="python",
-        args=["working_ocr_server.py"]
-    )
-    
-    async with stdio_client(server_params) as (read, write):
+    async with stdio_client(server_params()) as (read, write):
         async with ClientSession(read, write) as session:
             await session.initialize()
-            
+
             result = await session.call_tool(
                 "perform_ocr",
-                {"image_path": image_path}
+                # Inline mode reads the whole file; keep that off the event loop
+                await asyncio.to_thread(ocr_arguments, image_path, inline)
             )
-            
+
             return result.content[0].text
 
+async def perform_ocr_document(document_path: str, on_page=None) -> str:
+    """
+    Perform OCR on a multi-page TIFF or PDF using the MCP OCR server
+
+    Args:
+        document_path: Path to the document
+        on_page: Optional callback ``(done, total, message)`` invoked with
+            each page's text as soon as the server finishes that page
+
+    Returns:
+        Extracted text of all pages
+    """
+    async def progress(done, total, message):
+        if on_page and message:
+            on_page(int(done), int(total or 0), message)
+
+    async with stdio_client(server_params()) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+
+            result = await session.call_tool(
+                "perform_ocr_document",
+                {"document_path": document_path},
+                progress_callback=progress,
+            )
+
+            return result.content[0].text
+
+async def perform_ocr_batch(image_paths, sessions: int = 1, concurrency: int = 4, on_result=None,
+                            inline: bool = False) -> dict:
+    """
+    Perform OCR on many images over a few long-lived server sessions
+
+    Args:
+        image_paths: Paths of the image files
+        sessions: Number of server subprocesses to keep open
+        concurrency: Number of in-flight ``call_tool`` requests per session
+        on_result: Optional callback ``(image_path, text, error)`` invoked as
+            soon as each image finishes
+        inline: Send image bytes instead of paths
+
+    Returns:
+        Mapping of image path to ``(text, error)``
+    """
+    queue = asyncio.Queue()
+    for image_path in image_paths:
+        queue.put_nowait(str(image_path))
+    results = {}
+
+    async def pump(session: ClientSession):
+        while True:
+            try:
+                image_path = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            text, error = None, None
+            try:
+                arguments = await asyncio.to_thread(ocr_arguments, image_path, inline)
+                result = await session.call_tool("perform_ocr", arguments)
+                text = result.content[0].text
+                # The server reports per-image failures as "Error..." text
+                if result.isError or text.startswith("Error"):
+                    text, error = None, text
+            except Exception as e:
+                error = str(e)
+            results[image_path] = (text, error)
+            if on_result:
+                on_result(image_path, text, error)
+
+    async def run_session():
+        async with stdio_client(server_params()) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                await asyncio.gather(*(pump(session) for _ in range(max(1, concurrency))))
+
+    await asyncio.gather(*(run_session() for _ in range(max(1, min(sessions, queue.qsize())))))
+    return results
+
+def expand_inputs(inputs) -> list[Path]:
+    """Expand file paths, glob patterns and directories into image paths"""
+    paths = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            paths.extend(sorted(
+                p for p in path.rglob("*")
+                if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS
+            ))
+        elif glob.has_magic(item):
+            paths.extend(Path(p) for p in sorted(glob.glob(item, recursive=True)) if Path(p).is_file())
+        else:
+            paths.append(path)
+    # Preserve order but drop duplicates
+    return list(dict.fromkeys(paths))
+
+def resolve_out_path(out: str, image_path: str) -> Path:
+    """Work out where the OCR text for ``image_path`` should be written"""
+    out_path = Path(out)
+    if out_path.is_dir() or str(out).endswith(("/", "\\")):
+        # Save into provided directory using image stem
+        out_path = out_path / (Path(image_path).stem + "_ocr.txt")
+    return out_path
+
+def batch_out_paths(out: str, image_paths) -> dict:
+    """
+    Output file for each image in batch mode
+
+    Files keep their folders below the inputs' common folder and their
+    extension (``x/scan.png`` -> ``<out>/x/scan.png_ocr.txt``), so
+    ``x/scan.png``, ``y/scan.png`` and ``x/scan.jpg`` do not overwrite
+    each other. Raises ValueError if two images still map to one file.
+    """
+    resolved = [Path(p).resolve() for p in image_paths]
+    root = Path(os.path.commonpath([p.parent for p in resolved]))
+    out_paths, seen = {}, {}
+    for image_path, path in zip(image_paths, resolved):
+        out_path = Path(out) / path.parent.relative_to(root) / f"{path.name}_ocr.txt"
+        # Case-insensitive file systems would merge names that differ only in case
+        other = seen.setdefault(str(out_path).lower(), image_path)
+        if other != image_path:
+            raise ValueError(f"'{other}' and '{image_path}' would both be saved as '{out_path}'")
+        out_paths[image_path] = out_path
+    return out_paths
+
+def save_text(out_path: Path, text: str):
+    # Ensure parent directory exists
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(text, encoding="utf-8")
+
+async def run_batch(image_paths, args):
+    """Run batch OCR and print a throughput/failure summary"""
+    done = 0
+    out_paths = batch_out_paths(args.out, image_paths) if args.out else {}
+
+    def on_result(image_path, text, error):
+        nonlocal done
+        done += 1
+        if error:
+            print(f" [{done}/{len(image_paths)}] FAILED {image_path}: {error}")
+            return
+        print(f" [{done}/{len(image_paths)}] OK {image_path}")
+        if args.out:
+            save_text(out_paths[image_path], text)
+
+    print(f" Processing {len(image_paths)} images over {args.sessions} session(s), "
+          f"{args.concurrency} in flight each")
+    start = time.perf_counter()
+    results = await perform_ocr_batch(
+        image_paths,
+        sessions=args.sessions,
+        concurrency=args.concurrency,
+        on_result=on_result,
+        inline=args.inline,
+    )
+    elapsed = time.perf_counter() - start
+
+    failures = {path: error for path, (_, error) in results.items() if error}
+    print("\n Batch Summary:")
+    print("=" * 50)
+    print(f" Images:     {len(results)}")
+    print(f" Succeeded:  {len(results) - len(failures)}")
+    print(f" Failed:     {len(failures)}")
+    print(f" Elapsed:    {elapsed:.2f}s")
+    print(f" Throughput: {len(results) / elapsed if elapsed else 0:.2f} images/sec")
+    for path, error in failures.items():
+        print(f"  - {path}: {error}")
+    print("=" * 50)
+    if args.out:
+        print(f" Saved OCR text to: {args.out}")
+    return failures
+
 async def main():
     """Main function"""
     parser = argparse.ArgumentParser(
-        description="Run OCR on an image using the local MCP server",
-        usage="python ocr_client.py <image_path> [--out OUTPUT_PATH]",
+        description="Run OCR on one or more images using the local MCP server",
+        usage="python ocr_client.py <image_path|glob|dir> [...] [--out OUTPUT_PATH] [--sessions N] [--concurrency N]",
+    )
+    parser.add_argument(
+        "image_paths",
+        nargs="+",
+        help="Image files, glob patterns or directories to OCR",
     )
-    parser.add_argument("image_path", help="Path to the image file to OCR")
     parser.add_argument(
         "--out",
         dest="out",
-        help="Optional path to save the extracted text. If a directory is provided, a file will be created inside it.",
+        help="Optional path to save the extracted text. If a directory is provided, a file will be created inside it. "
+             "In batch mode this is always treated as a directory.",
+    )
+    parser.add_argument(
+        "--sessions",
+        type=int,
+        default=1,
+        help="Batch mode: number of long-lived server sessions (default: 1)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Batch mode: concurrent OCR requests per session (default: 4)",
+    )
+    parser.add_argument(
+        "--inline",
+        action="store_true",
+        help="Send image bytes to the server instead of file paths (no shared filesystem needed)",
     )
     args = parser.parse_args()
 
-    image_path = args.image_path
+    image_paths = expand_inputs(args.image_paths)
+    batch = len(image_paths) > 1 or any(Path(i).is_dir() or glob.has_magic(i) for i in args.image_paths)
 
-    # Check if image file exists
-    if not Path(image_path).exists():
-        print(f"Error: Image file '{image_path}' not found!")
+    # Check if image files exist
+    missing = [p for p in image_paths if not p.exists()]
+    if missing or not image_paths:
+        for p in missing:
+            print(f"Error: Image file '{p}' not found!")
+        if not image_paths:
+            print("Error: No images matched the given inputs!")
         sys.exit(1)
 
+    if batch:
+        try:
+            failures = await run_batch([str(p) for p in image_paths], args)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        sys.exit(1 if failures else 0)
+
+    image_path = str(image_paths[0])
     try:
-        print(f" Processing image: {image_path}")
-        text = await perform_ocr(image_path)
+        if is_document(image_paths[0]):
+            print(f" Processing document: {image_path}")
+            if args.inline:
+                print(" Note: --inline applies to single images; the server reads documents by path")
+            def on_page(done, total, message):
+                header, _, page_text = message.partition("\n")
+                preview = " ".join(page_text.split())[:60]
+                print(f" [{done}/{total}] {header} {preview}")
+
+            text = await perform_ocr_document(image_path, on_page=on_page)
+        else:
+            print(f" Processing image: {image_path}")
+            text = await perform_ocr(image_path, inline=args.inline)
 
         print("\n OCR Results:")
         print("=" * 50)
@@ -66,13 +325,8 @@ async def main():
 
         # Save to file if requested
         if args.out:
-            out_path = Path(args.out)
-            if out_path.is_dir() or str(args.out).endswith(("/", "\\")):
-                # Save into provided directory using image stem
-                out_path = out_path / (Path(image_path).stem + "_ocr.txt")
-            # Ensure parent directory exists
-            out_path.parent.mkdir(parents=True, exist_ok=True)
-            out_path.write_text(text, encoding="utf-8")
+            out_path = resolve_out_path(args.out, image_path)
+            save_text(out_path, text)
             print(f" Saved OCR text to: {out_path}")
 
     except Exception as e:
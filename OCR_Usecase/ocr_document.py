@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Lazy page access for multi-page documents (multi-frame images and PDFs)
+"""
+
+from pathlib import Path
+
+from PIL import Image
+
+# Optional: PDF rasterization
+try:
+    import pypdfium2 as pdfium
+    HAS_PDF = True
+except ImportError:
+    HAS_PDF = False
+
+DEFAULT_PDF_DPI = 300
+
+
+def is_pdf(path: str) -> bool:
+    if Path(path).suffix.lower() == ".pdf":
+        return True
+    with open(path, "rb") as f:
+        return f.read(5) == b"%PDF-"
+
+
+def _require_pdf():
+    if not HAS_PDF:
+        raise RuntimeError("PDF support needs pypdfium2. Install with: pip install pypdfium2")
+
+
+def page_count(path: str) -> int:
+    """Number of pages (PDF) or frames (TIFF, GIF, ...) without decoding them"""
+    if is_pdf(path):
+        _require_pdf()
+        pdf = pdfium.PdfDocument(path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    with Image.open(path) as image:
+        return getattr(image, "n_frames", 1)
+
+
+def load_page(path: str, index: int, dpi: int = DEFAULT_PDF_DPI) -> Image.Image:
+    """
+    Decode a single page of a document.
+
+    PDF pages are rasterized at ``dpi``; image frames are seeked to, so only
+    the requested frame is decoded. The caller closes the returned image.
+    """
+    if is_pdf(path):
+        _require_pdf()
+        pdf = pdfium.PdfDocument(path)
+        try:
+            page = pdf[index]
+            try:
+                return page.render(scale=dpi / 72).to_pil()
+            finally:
+                page.close()
+        finally:
+            pdf.close()
+    image = Image.open(path)
+    try:
+        image.seek(index)
+    except EOFError:
+        image.close()
+        raise IndexError(f"Page {index + 1} is out of range for '{path}'") from None
+    return image
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Image preprocessing steps applied before Tesseract
+"""
+
+import time
+
+from PIL import Image, ImageOps
+
+# Optional: NumPy powers the vectorized threshold and deskew steps
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# Steps always run in this order, whatever order the caller lists them in
+STEPS = ("downscale", "grayscale", "deskew", "threshold")
+
+DEFAULT_TARGET_DPI = 300
+# Long side of an A4 page in inches; used when the image carries no DPI
+PAGE_LONG_SIDE_IN = 11.7
+
+
+def _source_dpi(image: Image.Image) -> float | None:
+    dpi = image.info.get("dpi")
+    if dpi and dpi[0] and dpi[0] > 1:
+        return float(dpi[0])
+    return None
+
+
+def downscale_factor(image: Image.Image, target_dpi: int) -> float:
+    """Scale factor that brings the image down to ``target_dpi`` (never up)"""
+    dpi = _source_dpi(image)
+    # Cameras often write a placeholder 72 dpi; ignore DPIs that imply a poster-sized page
+    if dpi and max(image.size) / dpi <= 2 * PAGE_LONG_SIDE_IN:
+        return min(1.0, target_dpi / dpi)
+    # No usable DPI: assume the image is one page and cap its long side
+    return min(1.0, target_dpi * PAGE_LONG_SIDE_IN / max(image.size))
+
+
+def downscale(image: Image.Image, target_dpi: int = DEFAULT_TARGET_DPI) -> Image.Image:
+    """Apply the EXIF orientation and resample to at most ``target_dpi``"""
+    factor = downscale_factor(image, target_dpi)
+    if factor >= 1.0:
+        return ImageOps.exif_transpose(image)
+    size = (max(1, round(image.width * factor)), max(1, round(image.height * factor)))
+    if image.format == "JPEG":
+        # Let the JPEG decoder skip detail we are about to throw away
+        image.draft(image.mode, size)
+    if image.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+        # Orientation tags that swap width and height
+        size = size[::-1]
+    image = ImageOps.exif_transpose(image)
+    if image.size != size:
+        image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    return image
+
+
+def grayscale(image: Image.Image) -> Image.Image:
+    return image if image.mode == "L" else image.convert("L")
+
+
+def adaptive_threshold(image: Image.Image, window: int = 31, offset: int = 10) -> Image.Image:
+    """
+    Binarize with a local-mean threshold computed from running box sums.
+
+    A pixel becomes white when it is brighter than the mean of the
+    ``window`` x ``window`` box around it minus ``offset``. The image is
+    processed in bands of rows, so the wide integer sums only ever cover
+    one band plus the window margin, never the whole frame.
+    """
+    a = np.asarray(grayscale(image), dtype=np.uint8)
+    h, w = a.shape
+    r = window // 2
+    cols = np.arange(w)
+    x0, x1 = np.clip(cols - r, 0, w), np.clip(cols + r + 1, 0, w)
+    out = np.empty((h, w), dtype=np.uint8)
+    band = max(window, 64)
+    for top in range(0, h, band):
+        bottom = min(top + band, h)
+        lo, hi = max(0, top - r), min(h, bottom + r)
+        rows = np.arange(top, bottom)
+        y0, y1 = np.clip(rows - r, 0, h) - lo, np.clip(rows + r + 1, 0, h) - lo
+
+        # Column sums over each output row's window, from a running sum down the band
+        running = np.zeros((hi - lo + 1, w), dtype=np.int32)
+        np.cumsum(a[lo:hi], axis=0, out=running[1:])
+        columns = running[y1] - running[y0]
+        # ...then box sums along each row from a running sum across it
+        running = np.zeros((bottom - top, w + 1), dtype=np.int64)
+        np.cumsum(columns, axis=1, out=running[:, 1:])
+        box = running[:, x1] - running[:, x0]
+        area = (y1 - y0)[:, None] * (x1 - x0)[None, :]
+
+        # a > box / area - offset, rearranged to stay in integers
+        out[top:bottom] = np.where(a[top:bottom] * area > box - offset * area, 255, 0)
+    return Image.fromarray(out, "L")
+
+
+def estimate_skew(image: Image.Image, max_angle: float = 5.0, step: float = 0.5) -> float:
+    """Estimate the text skew angle in degrees from horizontal projection profiles"""
+    thumb = grayscale(image).copy()
+    thumb.thumbnail((800, 800))
+    # Ink pixels become 255 so rotation fills the background with zeros
+    ink = ImageOps.invert(thumb).point(lambda v: 255 if v > 96 else 0)
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-max_angle, max_angle + step / 2, step):
+        profile = np.asarray(ink.rotate(float(angle), resample=Image.Resampling.NEAREST), dtype=np.float32).sum(axis=1)
+        score = float(np.square(np.diff(profile)).sum())
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+
+def deskew(image: Image.Image) -> Image.Image:
+    angle = estimate_skew(image)
+    if abs(angle) < 1e-6:
+        return image
+    fill = 255 if image.mode == "L" else (255,) * len(image.getbands())
+    return image.rotate(angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=fill)
+
+
+def preprocess(image: Image.Image, steps, target_dpi: int = DEFAULT_TARGET_DPI):
+    """
+    Run the selected preprocessing ``steps`` on ``image``
+
+    Returns:
+        The processed image and a list of ``{"step", "ms"}`` timings
+    """
+    unknown = set(steps) - set(STEPS)
+    if unknown:
+        raise ValueError(f"Unknown preprocessing step(s): {', '.join(sorted(unknown))}")
+    if not HAS_NUMPY and {"threshold", "deskew"} & set(steps):
+        raise RuntimeError("The 'threshold' and 'deskew' steps need NumPy. Install with: pip install numpy")
+
+    funcs = {
+        "downscale": lambda im: downscale(im, target_dpi),
+        "grayscale": grayscale,
+        "deskew": deskew,
+        "threshold": adaptive_threshold,
+    }
+    timings = []
+    for step in STEPS:
+        if step not in steps:
+            continue
+        start = time.perf_counter()
+        image = funcs[step](image)
+        timings.append({"step": step, "ms": round((time.perf_counter() - start) * 1000, 2)})
+    return image, timings
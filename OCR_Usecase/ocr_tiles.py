@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Tiled OCR for very large images
+
+The source image is decoded once into an uncompressed grayscale TIFF
+(the "spill" file) unless it already is one. Pillow memory-maps such
+files, so each tile job only touches the rows it crops and its resident
+memory stays bounded by the tile size rather than the full image.
+"""
+
+import io
+import os
+from contextlib import contextmanager
+
+import pytesseract
+from PIL import Image, ImageOps
+
+from ocr_preprocess import downscale_factor, preprocess
+from ocr_words import empty_columns
+
+DEFAULT_TILE_SIZE = 2048
+DEFAULT_OVERLAP = 256
+
+# Bounds on tile settings; every tile is a tesseract job, so tiny tiles or
+# an overlap close to the tile size would flood the worker pool
+MIN_TILE_SIZE = 256
+MAX_TILE_SIZE = 8192
+
+# Pixel cap for images sent as bytes. Pillow's decompression-bomb limit is
+# lifted for tiled mode, so inline input from remote clients is checked
+# against this instead, from the header, before anything is decoded.
+MAX_INLINE_PIXELS = int(float(os.getenv("OCR_MAX_INLINE_MEGAPIXELS", "250")) * 1_000_000)
+
+# Preprocessing steps that can run per tile without moving word coordinates
+TILE_STEPS = ("grayscale", "threshold")
+
+# Word tuple layout returned by ocr_tile()
+TEXT, CONF, LEFT, TOP, WIDTH, HEIGHT, TRUNCATED = range(7)
+
+
+@contextmanager
+def allow_large_images():
+    """Lift Pillow's decompression-bomb limit; tiled mode exists for huge scans"""
+    limit = Image.MAX_IMAGE_PIXELS
+    Image.MAX_IMAGE_PIXELS = None
+    try:
+        yield
+    finally:
+        Image.MAX_IMAGE_PIXELS = limit
+
+
+def _is_mappable(image: Image.Image) -> bool:
+    """True when Pillow will memory-map the file instead of decoding it"""
+    return (
+        image.mode == "L"
+        and len(image.tile) == 1
+        and image.tile[0][0] == "raw"
+        and image.getexif().get(0x0112, 1) == 1
+    )
+
+
+def prepare_source(image: str | bytes, spill_dir: str, target_dpi: int | None = None) -> dict:
+    """
+    Make a memory-mappable copy of ``image`` (a path or encoded bytes) for the tile jobs.
+
+    Encoded bytes larger than MAX_INLINE_PIXELS are rejected before decoding.
+
+    JPEGs are decoded straight to grayscale (and at reduced scale when
+    ``target_dpi`` asks for downscaling). Returns the source path, its
+    size and the scale applied.
+    """
+    in_memory = isinstance(image, bytes)
+    with allow_large_images(), Image.open(io.BytesIO(image) if in_memory else image) as image:
+        if in_memory and image.width * image.height > MAX_INLINE_PIXELS:
+            raise ValueError(
+                f"Inline image is {image.width}x{image.height}, over the "
+                f"{MAX_INLINE_PIXELS / 1_000_000:g} megapixel limit for image bytes"
+            )
+        factor = downscale_factor(image, target_dpi) if target_dpi else 1.0
+        if factor >= 1.0 and not in_memory and _is_mappable(image):
+            return {"source": image.filename, "size": list(image.size), "scale": 1.0, "spilled": False}
+
+        size = (max(1, round(image.width * factor)), max(1, round(image.height * factor)))
+        if image.format == "JPEG":
+            image.draft("L", size)
+        if image.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+            # Orientation tags that swap width and height
+            size = size[::-1]
+        image = ImageOps.exif_transpose(image).convert("L")
+        if image.size != size:
+            image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+        spill_path = os.path.join(spill_dir, "source.tif")
+        image.save(spill_path, format="TIFF")
+        return {"source": spill_path, "size": list(image.size), "scale": factor, "spilled": True}
+
+
+def check_tiling(tile_size: int, overlap: int):
+    """Raise ValueError unless MIN_TILE_SIZE <= tile_size <= MAX_TILE_SIZE and 0 <= overlap < tile_size // 2"""
+    if not MIN_TILE_SIZE <= tile_size <= MAX_TILE_SIZE:
+        raise ValueError(f"tile_size must be between {MIN_TILE_SIZE} and {MAX_TILE_SIZE} pixels, got {tile_size}")
+    if not 0 <= overlap < tile_size // 2:
+        raise ValueError(f"tile_overlap must be at least 0 and below half the tile size ({tile_size // 2}), got {overlap}")
+
+
+def plan_tiles(width: int, height: int, tile_size: int, overlap: int) -> list[tuple]:
+    """Overlapping tile boxes in reading order (left to right, top to bottom)"""
+    check_tiling(tile_size, overlap)
+    step = tile_size - overlap
+
+    def starts(length: int) -> list[int]:
+        if length <= tile_size:
+            return [0]
+        return list(range(0, length - tile_size, step)) + [length - tile_size]
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+def ocr_tile(source: str, box: tuple, image_size: tuple, steps, lang: str, config: str,
+             timeout: float) -> list[tuple]:
+    """
+    Recognize one tile and return its words in full-image coordinates.
+
+    Words touching a tile edge that is not an image border are flagged as
+    truncated; the overlapping neighbour normally sees them whole.
+    """
+    with allow_large_images(), Image.open(source) as image:
+        tile = image.crop(box)
+    tile, _ = preprocess(tile, [s for s in steps if s in TILE_STEPS])
+    data = pytesseract.image_to_data(
+        tile,
+        lang=lang,
+        config=config,
+        output_type=pytesseract.Output.DICT,
+        timeout=timeout,
+    )
+
+    x0, y0, x1, y1 = box
+    cut_left, cut_top = x0 > 0, y0 > 0
+    cut_right, cut_bottom = x1 < image_size[0], y1 < image_size[1]
+    tile_w, tile_h = tile.size
+    words = []
+    for i, text in enumerate(data["text"]):
+        if int(data["level"][i]) != 5 or not str(text).strip():
+            continue
+        left, top = int(data["left"][i]), int(data["top"][i])
+        width, height = int(data["width"][i]), int(data["height"][i])
+        truncated = (
+            (cut_left and left <= 1)
+            or (cut_top and top <= 1)
+            or (cut_right and left + width >= tile_w - 1)
+            or (cut_bottom and top + height >= tile_h - 1)
+        )
+        words.append((str(text), float(data["conf"][i]), left + x0, top + y0, width, height, truncated))
+    return words
+
+
+def _overlap(a: tuple, b: tuple) -> float:
+    """Intersection area over the smaller box's area"""
+    ix = min(a[LEFT] + a[WIDTH], b[LEFT] + b[WIDTH]) - max(a[LEFT], b[LEFT])
+    iy = min(a[TOP] + a[HEIGHT], b[TOP] + b[HEIGHT]) - max(a[TOP], b[TOP])
+    if ix <= 0 or iy <= 0:
+        return 0.0
+    smaller = min(a[WIDTH] * a[HEIGHT], b[WIDTH] * b[HEIGHT]) or 1
+    return ix * iy / smaller
+
+
+def dedupe_words(words: list[tuple], cell: int = 64) -> list[tuple]:
+    """
+    Drop words recognized twice in overlap regions.
+
+    Whole words beat truncated ones, then higher confidence wins. A spatial
+    hash on word centres keeps this linear in the number of words.
+    """
+    grid = {}
+    kept = []
+    for word in sorted(words, key=lambda w: (w[TRUNCATED], -w[CONF])):
+        cx = (word[LEFT] + word[WIDTH] // 2) // cell
+        cy = (word[TOP] + word[HEIGHT] // 2) // cell
+        reach_x = word[WIDTH] // cell + 1
+        reach_y = word[HEIGHT] // cell + 1
+        duplicate = any(
+            _overlap(word, other) > 0.5
+            for gx in range(cx - reach_x, cx + reach_x + 1)
+            for gy in range(cy - reach_y, cy + reach_y + 1)
+            for other in grid.get((gx, gy), ())
+        )
+        if duplicate:
+            continue
+        kept.append(word)
+        grid.setdefault((cx, cy), []).append(word)
+    return kept
+
+
+def group_lines(words: list[tuple]) -> list[list[list[tuple]]]:
+    """Group words into paragraphs of lines, top to bottom and left to right"""
+    lines = []  # [top, bottom, words]
+    for word in sorted(words, key=lambda w: w[TOP] + w[HEIGHT] / 2):
+        centre = word[TOP] + word[HEIGHT] / 2
+        for line in reversed(lines[-5:]):
+            if line[0] <= centre <= line[1]:
+                line[2].append(word)
+                break
+        else:
+            lines.append([word[TOP], word[TOP] + word[HEIGHT], [word]])
+    if not lines:
+        return []
+
+    heights = sorted(line[1] - line[0] for line in lines)
+    median_height = heights[len(heights) // 2] or 1
+    paragraphs = []
+    previous_bottom = None
+    for top, bottom, line_words in lines:
+        # A gap of more than 1.5 line heights starts a new paragraph
+        if previous_bottom is None or top - previous_bottom > 1.5 * median_height:
+            paragraphs.append([])
+        paragraphs[-1].append(sorted(line_words, key=lambda w: w[LEFT]))
+        previous_bottom = bottom
+    return paragraphs
+
+
+def words_to_text(words: list[tuple]) -> str:
+    """Stitched text with blank lines between paragraphs"""
+    return "\n\n".join(
+        "\n".join(" ".join(w[TEXT] for w in line) for line in paragraph)
+        for paragraph in group_lines(words)
+    )
+
+
+def words_to_columns(words: list[tuple]) -> dict:
+    """Columnar word data (see ``ocr_words``); each paragraph becomes a block"""
+    columns = empty_columns()
+    for block, paragraph in enumerate(group_lines(words), start=1):
+        for line_num, line in enumerate(paragraph, start=1):
+            for word in line:
+                columns["text"].append(word[TEXT])
+                columns["conf"].append(round(word[CONF], 2))
+                columns["left"].append(word[LEFT])
+                columns["top"].append(word[TOP])
+                columns["width"].append(word[WIDTH])
+                columns["height"].append(word[HEIGHT])
+                columns["block"].append(block)
+                columns["par"].append(1)
+                columns["line"].append(line_num)
+    return columns
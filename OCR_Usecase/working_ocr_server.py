@@ -4,41 +4,398 @@ Working MCP OCR Server
 """
 
 import asyncio
+import base64
+import binascii
+import hashlib
+import io
+import json
+import multiprocessing
 import sys
 import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from urllib.parse import quote, unquote_to_bytes, urlparse
+from urllib.request import url2pathname
+# Cold-start timings are measured from here; the stdlib imports above are negligible
+_STARTED = time.perf_counter()
+
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
-from mcp.types import Tool, TextContent
-
-# Optional: Try to import OCR libraries
-try:
-    from PIL import Image
-    import pytesseract
-    HAS_OCR = True
-except ImportError:
-    HAS_OCR = False
-    print("Warning: OCR libraries not installed. Install with: pip install pillow pytesseract", file=sys.stderr)
-
-# If OCR libs are present, try to locate the Tesseract binary explicitly (Windows-friendly)
-if 'pytesseract' in globals():
+from mcp.types import Tool, TextContent, EmbeddedResource, BlobResourceContents
+from ocr_cache import OCRCache, file_digest
+import ocr_words
+
+# Shared request metrics live at the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import mcp_metrics
+
+# Where the cold-start milliseconds go (served by the ocr_startup tool)
+STARTUP = {"core_imports_ms": round((time.perf_counter() - _STARTED) * 1000, 2)}
+
+
+def _mark(event: str):
+    """Record the first occurrence of ``event`` in ms since the server module started loading"""
+    STARTUP.setdefault(event, round((time.perf_counter() - _STARTED) * 1000, 2))
+
+
+# Optional OCR libraries (PIL, NumPy, pytesseract, pypdfium2) are imported on
+# first use by _load_ocr(), so the MCP handshake and list_tools answer at once.
+# None means "not loaded yet".
+HAS_OCR = None
+
+
+def _load_ocr() -> bool:
+    """Import the optional OCR libraries once; returns whether real OCR is available"""
+    global HAS_OCR, Image, pytesseract, PREPROCESS_STEPS, DEFAULT_TARGET_DPI, preprocess
+    global DEFAULT_PDF_DPI, is_pdf, load_page, page_count
+    global DEFAULT_OVERLAP, DEFAULT_TILE_SIZE, TILE_STEPS
+    global check_tiling, dedupe_words, ocr_tile, plan_tiles, prepare_source, words_to_columns, words_to_text
+    if HAS_OCR is not None:
+        return HAS_OCR
+
+    # OCR_MOCK=1 forces the mock path, e.g. to benchmark transport overhead only
+    if os.getenv("OCR_MOCK") == "1":
+        HAS_OCR = False
+        return HAS_OCR
+
+    imports = {}
+    step = time.perf_counter()
+
+    def timed(name: str):
+        nonlocal step
+        now = time.perf_counter()
+        imports[name] = round((now - step) * 1000, 2)
+        step = now
+
+    start = step
     try:
-        # Allow override via environment variable
-        env_cmd = os.getenv("TESSERACT_CMD")
-        candidate_paths = [
-            env_cmd if env_cmd else None,
-            os.path.join(os.getenv("LOCALAPPDATA", ""), "Programs", "Tesseract-OCR", "tesseract.exe"),
-            r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe",
-            r"C:\\Program Files (x86)\\Tesseract-OCR\\tesseract.exe",
-        ]
-        candidate_paths = [p for p in candidate_paths if p]
-        for p in candidate_paths:
-            if Path(p).exists():
-                pytesseract.pytesseract.tesseract_cmd = p
-                break
-    except Exception:
-        # Non-fatal; will be handled during OCR call
-        pass
+        from PIL import Image
+        timed("PIL")
+        import pytesseract
+        timed("pytesseract")
+        from ocr_preprocess import STEPS as PREPROCESS_STEPS, DEFAULT_TARGET_DPI, preprocess
+        timed("ocr_preprocess")
+        from ocr_document import DEFAULT_PDF_DPI, is_pdf, load_page, page_count
+        timed("ocr_document")
+        from ocr_tiles import (
+            DEFAULT_OVERLAP, DEFAULT_TILE_SIZE, TILE_STEPS,
+            check_tiling, dedupe_words, ocr_tile, plan_tiles, prepare_source, words_to_columns, words_to_text,
+        )
+        timed("ocr_tiles")
+        HAS_OCR = True
+    except ImportError:
+        HAS_OCR = False
+        print("Warning: OCR libraries not installed. Install with: pip install pillow pytesseract", file=sys.stderr)
+    STARTUP["ocr_imports_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    STARTUP["ocr_imports"] = imports
+
+    # If OCR libs are present, try to locate the Tesseract binary explicitly (Windows-friendly)
+    if HAS_OCR:
+        start = time.perf_counter()
+        try:
+            # Allow override via environment variable
+            env_cmd = os.getenv("TESSERACT_CMD")
+            candidate_paths = [
+                env_cmd if env_cmd else None,
+                os.path.join(os.getenv("LOCALAPPDATA", ""), "Programs", "Tesseract-OCR", "tesseract.exe"),
+                r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe",
+                r"C:\\Program Files (x86)\\Tesseract-OCR\\tesseract.exe",
+            ]
+            candidate_paths = [p for p in candidate_paths if p]
+            for p in candidate_paths:
+                if Path(p).exists():
+                    pytesseract.pytesseract.tesseract_cmd = p
+                    break
+        except Exception:
+            # Non-fatal; will be handled during OCR call
+            pass
+        STARTUP["tesseract_probe_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return HAS_OCR
+
+
+_ocr_loading = None
+
+
+async def ocr_ready() -> bool:
+    """Load the OCR libraries off the event loop (once) and report whether real OCR is available"""
+    global _ocr_loading
+    if _ocr_loading is None:
+        _ocr_loading = asyncio.ensure_future(asyncio.to_thread(_load_ocr))
+    return await _ocr_loading
+
+# OCR execution engine settings (override via environment)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+OCR_MAX_INFLIGHT = int(os.getenv("OCR_MAX_INFLIGHT", OCR_WORKERS))
+OCR_MAX_QUEUE = int(os.getenv("OCR_MAX_QUEUE", "64"))
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", "60"))
+
+# OCR_WARMUP=1 starts the worker pool and runs tesseract once per worker in
+# the background right after startup, so the first real request skips it
+OCR_WARMUP = os.getenv("OCR_WARMUP", "0") == "1"
+OCR_WARMUP_LANG = os.getenv("OCR_WARMUP_LANG", "eng")
+
+# Largest image accepted as inline bytes (image_data / data: URIs)
+OCR_MAX_IMAGE_MB = float(os.getenv("OCR_MAX_IMAGE_MB", "50"))
+
+# Result cache settings (OCR_CACHE=0 disables the cache)
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE", "1") != "0"
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ocr_cache"))
+OCR_CACHE_MAX_MB = float(os.getenv("OCR_CACHE_MAX_MB", "256"))
+
+
+class EngineBusyError(RuntimeError):
+    """Raised when the admission queue is full and a job is rejected."""
+
+
+class OCREngine:
+    """
+    Runs blocking OCR jobs in a persistent process pool.
+
+    At most ``max_inflight`` jobs run at once; up to ``max_queue`` further
+    jobs wait for a slot and anything beyond that is rejected immediately.
+    ``max_inflight`` is capped at ``workers`` so an admitted job starts on
+    a worker right away: its timeout never covers time spent queued inside
+    the pool.
+    """
+
+    def __init__(self, workers: int, max_inflight: int, max_queue: int, timeout: float):
+        self.workers = max(1, workers)
+        self.max_inflight = max(1, min(max_inflight, self.workers))
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout
+        self._pool = None
+        self._slots = asyncio.Semaphore(self.max_inflight)
+        self._waiting = 0
+        self._running = 0
+        self._jobs = {}  # in-flight future -> the pool it runs in
+        self._reapers = set()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+            "running": self._running,
+            "queued": self._waiting,
+        }
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # "spawn" avoids forking the server while stdio reader threads are live
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def _recycle_pool(self, pool: ProcessPoolExecutor):
+        """
+        Retire ``pool`` after one of its jobs timed out.
+
+        New jobs go to a fresh pool. The old pool's other in-flight jobs may
+        finish; then its remaining worker processes (the stuck one) are killed.
+        """
+        if self._pool is pool:
+            self._pool = None
+        # shutdown() drops the executor's process table, so take it first
+        processes = list((pool._processes or {}).values())
+        others = [future for future, owner in self._jobs.items() if owner is pool]
+        pool.shutdown(wait=False)
+        reaper = asyncio.ensure_future(self._reap(processes, others))
+        self._reapers.add(reaper)
+        reaper.add_done_callback(self._reapers.discard)
+
+    async def _reap(self, processes: list, others: list):
+        if others:
+            await asyncio.wait(others, timeout=self.timeout + 5)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            await asyncio.to_thread(process.join, 5)
+
+    async def submit(self, fn, *args, timeout: float | None = None):
+        """Run ``fn(*args)`` in the pool, honouring admission and timeout limits."""
+        if self._waiting >= self.max_queue and self._slots.locked():
+            raise EngineBusyError(
+                f"OCR server busy: {self._running} running, {self._waiting} queued"
+            )
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._running += 1
+        try:
+            timeout = self.timeout if timeout is None else timeout
+            loop = asyncio.get_running_loop()
+            pool = self._get_pool()
+            future = loop.run_in_executor(pool, fn, *args)
+            self._jobs[future] = pool
+            try:
+                # The timeout is enforced per job: pytesseract kills only this
+                # job's tesseract process after ``timeout``. The grace period
+                # catches jobs stuck outside tesseract; their worker is killed
+                # once the other jobs in flight on that pool are done.
+                return await asyncio.wait_for(future, timeout + 5)
+            except asyncio.TimeoutError:
+                self._recycle_pool(pool)
+                raise
+            finally:
+                self._jobs.pop(future, None)
+        finally:
+            self._running -= 1
+            self._slots.release()
+
+    async def warm_up(self, fn, *args) -> list:
+        """
+        Start the worker processes by running ``fn(*args)`` once per worker.
+
+        Each warm-up job holds an admission slot, so real jobs that arrive
+        meanwhile wait for a slot (their timeout not yet started) instead of
+        queueing behind warm-up jobs inside the pool.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+
+        async def warm_one():
+            async with self._slots:
+                return await loop.run_in_executor(pool, fn, *args)
+
+        # Workers are spawned on demand, one per job submitted while none is idle
+        return await asyncio.wait_for(
+            asyncio.gather(*(warm_one() for _ in range(self.workers))), self.timeout + 5
+        )
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+engine = OCREngine(OCR_WORKERS, OCR_MAX_INFLIGHT, OCR_MAX_QUEUE, OCR_TIMEOUT)
+cache = OCRCache(OCR_CACHE_DIR, int(OCR_CACHE_MAX_MB * 1024 * 1024)) if OCR_CACHE_ENABLED else None
+
+CACHE_MODES = ("use", "bypass", "refresh")
+OUTPUT_MODES = ("text", "columns", "binary")
+
+
+def _ocr_settings(arguments: dict) -> dict:
+    """
+    OCR settings that affect the recognized text (and the cache key)
+
+    Raises ValueError for tile settings outside the bounds of ``check_tiling``.
+    """
+    psm = arguments.get("psm")
+    steps = arguments.get("preprocess") or []
+    settings = {
+        "lang": arguments.get("lang") or "eng",
+        "psm": int(psm) if psm is not None else None,
+        "preprocess": sorted(set(steps)),
+    }
+    if "downscale" in steps:
+        settings["target_dpi"] = int(arguments.get("target_dpi") or DEFAULT_TARGET_DPI)
+    if (arguments.get("output") or "text") != "text":
+        # Both structured modes share the cached columnar JSON
+        settings["output"] = "words"
+    if arguments.get("tiled"):
+        tile_size = int(arguments.get("tile_size") or DEFAULT_TILE_SIZE)
+        overlap = arguments.get("tile_overlap")
+        # The default overlap shrinks with a small tile_size so it stays valid
+        overlap = int(overlap) if overlap is not None else min(DEFAULT_OVERLAP, tile_size // 4)
+        check_tiling(tile_size, overlap)
+        settings["tiled"] = {"tile_size": tile_size, "overlap": overlap}
+    return settings
+
+
+def _tesseract_config(settings: dict) -> str:
+    return f"--psm {settings['psm']}" if settings["psm"] is not None else ""
+
+
+def _ocr_image(source: str | bytes, settings: dict, timeout: float, page: int | None = None) -> tuple[str, dict]:
+    """
+    Worker-side OCR job (runs inside the process pool).
+
+    ``source`` is a file path or the encoded image bytes. ``page`` selects
+    one page of a multi-page document; only that page is decoded. Returns
+    the recognized text and a report of preprocessing/tesseract timings.
+    """
+    _load_ocr()
+    try:
+        if page is not None:
+            opened = load_page(source, page, settings.get("pdf_dpi", DEFAULT_PDF_DPI))
+        elif isinstance(source, bytes):
+            opened = Image.open(io.BytesIO(source))
+        else:
+            opened = Image.open(source)
+        with opened as image:
+            image, timings = preprocess(
+                image,
+                settings["preprocess"],
+                settings.get("target_dpi", DEFAULT_TARGET_DPI),
+            )
+            start = time.perf_counter()
+            if settings.get("output") == "words":
+                data = pytesseract.image_to_data(
+                    image,
+                    lang=settings["lang"],
+                    config=_tesseract_config(settings),
+                    output_type=pytesseract.Output.DICT,
+                    timeout=timeout,
+                )
+                # Serialize here so the server process only forwards the string
+                text = ocr_words.to_json(ocr_words.columns_from_data(data), *image.size)
+            else:
+                text = pytesseract.image_to_string(
+                    image,
+                    lang=settings["lang"],
+                    config=_tesseract_config(settings),
+                    timeout=timeout,
+                )
+            report = {
+                "preprocess": timings,
+                "image_size": list(image.size),
+                "tesseract_ms": round((time.perf_counter() - start) * 1000, 2),
+            }
+            return text, report
+    except pytesseract.TesseractNotFoundError as e:
+        # pytesseract's exception cannot be unpickled in the parent process
+        raise TesseractMissingError(str(e)) from None
+
+
+def _ocr_tile(*args) -> list[tuple]:
+    """Worker-side tile job; see ``ocr_tiles.ocr_tile``."""
+    _load_ocr()
+    try:
+        return ocr_tile(*args)
+    except pytesseract.TesseractNotFoundError as e:
+        raise TesseractMissingError(str(e)) from None
+
+
+def _warm_worker(lang: str) -> dict:
+    """Worker-side warm-up: import the OCR libraries and run tesseract once on a blank image"""
+    start = time.perf_counter()
+    report = {"pid": os.getpid(), "tesseract_ms": None}
+    if _load_ocr():
+        imported = time.perf_counter()
+        try:
+            # Pulls the tesseract binary and the language data into the OS page cache
+            pytesseract.image_to_string(Image.new("L", (64, 32), 255), lang=lang, timeout=OCR_TIMEOUT)
+            report["tesseract_ms"] = round((time.perf_counter() - imported) * 1000, 2)
+        except Exception as e:
+            report["error"] = str(e) or e.__class__.__name__
+    report["imports_ms"] = STARTUP.get("ocr_imports_ms")
+    report["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return report
+
+
+class TesseractMissingError(RuntimeError):
+    """Picklable stand-in for ``pytesseract.TesseractNotFoundError``."""
+
 
 # Create server instance
 app = Server("ocr-server")
@@ -46,6 +403,7 @@ app = Server("ocr-server")
 @app.list_tools()
 async def list_tools() -> list[Tool]:
     """List available tools"""
+    _mark("list_tools_ms")
     return [
         Tool(
             name="perform_ocr",
@@ -56,36 +414,457 @@ async def list_tools() -> list[Tool]:
                     "image_path": {
                         "type": "string",
                         "description": "Path to the image file to process"
+                    },
+                    "image_data": {
+                        "description": "Encoded image bytes instead of a path: a base64 string or MCP blob "
+                                       "contents ({\"blob\": base64, \"mimeType\": ...}). Decoded in memory.",
+                        "anyOf": [
+                            {"type": "string"},
+                            {
+                                "type": "object",
+                                "properties": {"blob": {"type": "string"}, "mimeType": {"type": "string"}},
+                                "required": ["blob"]
+                            }
+                        ]
+                    },
+                    "image_uri": {
+                        "type": "string",
+                        "description": "Image as a data: URI or a file: URI"
+                    },
+                    "name": {
+                        "type": "string",
+                        "description": "Display name for image_data/image_uri input"
+                    },
+                    "lang": {
+                        "type": "string",
+                        "description": "Tesseract language(s), e.g. 'eng' or 'eng+deu' (default: eng)"
+                    },
+                    "psm": {
+                        "type": "integer",
+                        "description": "Tesseract page segmentation mode (0-13)"
+                    },
+                    "preprocess": {
+                        "type": "array",
+                        "items": {"type": "string", "enum": ["downscale", "grayscale", "deskew", "threshold"]},
+                        "description": "Preprocessing steps to run before tesseract. They always run in the order "
+                                       "downscale, grayscale, deskew, threshold. Timings are reported in a second "
+                                       "content item."
+                    },
+                    "target_dpi": {
+                        "type": "integer",
+                        "description": "DPI the 'downscale' step resamples to (default: 300)"
+                    },
+                    "output": {
+                        "type": "string",
+                        "enum": list(OUTPUT_MODES),
+                        "description": "'text' (default) returns prose. 'columns' returns word-level JSON with one "
+                                       "array per field (text, conf, left, top, width, height, block, par, line). "
+                                       "'binary' returns the same columns packed into an embedded blob resource."
+                    },
+                    "tiled": {
+                        "type": "boolean",
+                        "description": "Split a very large image into overlapping tiles, OCR them in parallel "
+                                       "and stitch the text in reading order. Supports the 'downscale', "
+                                       "'grayscale' and 'threshold' preprocessing steps."
+                    },
+                    "tile_size": {
+                        "type": "integer",
+                        "minimum": 256,
+                        "maximum": 8192,
+                        "description": "Tiled mode: tile edge length in pixels (default: 2048)"
+                    },
+                    "tile_overlap": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "maximum": 4095,
+                        "description": "Tiled mode: overlap between neighbouring tiles in pixels, "
+                                       "below half of tile_size (default: 256)"
+                    },
+                    "cache": {
+                        "type": "string",
+                        "enum": list(CACHE_MODES),
+                        "description": "Result cache policy: 'use' (default), 'bypass' to skip it, "
+                                       "'refresh' to recompute and overwrite the cached entry"
                     }
+                }
+            }
+        ),
+        Tool(
+            name="perform_ocr_document",
+            description="Perform OCR page by page on a multi-page TIFF or PDF. Sends a progress "
+                        "notification with each page's text as soon as that page is done.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "document_path": {
+                        "type": "string",
+                        "description": "Path to the multi-page TIFF/image or PDF file"
+                    },
+                    "dpi": {
+                        "type": "integer",
+                        "description": "Resolution PDF pages are rasterized at (default: 300)"
+                    },
+                    "lang": {"type": "string"},
+                    "psm": {"type": "integer"},
+                    "preprocess": {
+                        "type": "array",
+                        "items": {"type": "string", "enum": ["downscale", "grayscale", "deskew", "threshold"]}
+                    },
+                    "target_dpi": {"type": "integer"},
+                    "cache": {"type": "string", "enum": list(CACHE_MODES)}
                 },
-                "required": ["image_path"]
+                "required": ["document_path"]
             }
+        ),
+        Tool(
+            name="ocr_cache",
+            description="Report OCR result cache statistics or purge cached entries",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "action": {
+                        "type": "string",
+                        "enum": ["stats", "purge"],
+                        "description": "'stats' (default) or 'purge'"
+                    },
+                    "image_path": {
+                        "type": "string",
+                        "description": "With 'purge': only drop this image's entry for the given lang/psm"
+                    },
+                    "lang": {"type": "string"},
+                    "psm": {"type": "integer"},
+                    "preprocess": {"type": "array", "items": {"type": "string"}},
+                    "target_dpi": {"type": "integer"}
+                }
+            }
+        ),
+        Tool(
+            name="ocr_startup",
+            description="Report where the server's cold-start time went (imports, tesseract probe, "
+                        "worker warm-up, first request and first result)",
+            inputSchema={"type": "object", "properties": {}}
         )
     ]
 
+
+class ImageInputError(ValueError):
+    """Raised for missing, malformed or oversized image input."""
+
+
+def _decode_base64(data: str) -> bytes:
+    if len(data) * 3 // 4 > OCR_MAX_IMAGE_MB * 1024 * 1024:
+        raise ImageInputError(f"Image data exceeds the {OCR_MAX_IMAGE_MB:g} MB limit")
+    try:
+        return base64.b64decode(data, validate=True)
+    except (binascii.Error, ValueError):
+        raise ImageInputError("Image data is not valid base64") from None
+
+
+def _decode_data_uri(uri: str) -> bytes:
+    header, sep, payload = uri[len("data:"):].partition(",")
+    if not sep:
+        raise ImageInputError("Malformed data: URI")
+    if header.endswith(";base64"):
+        return _decode_base64(payload)
+    data = unquote_to_bytes(payload)
+    if len(data) > OCR_MAX_IMAGE_MB * 1024 * 1024:
+        raise ImageInputError(f"Image data exceeds the {OCR_MAX_IMAGE_MB:g} MB limit")
+    return data
+
+
+async def _resolve_image(arguments: dict) -> tuple[str | bytes, str]:
+    """
+    Turn perform_ocr's image arguments into an OCR source and a display label
+
+    Inline bytes stay in memory; they are never written to a temp file.
+    """
+    image_path = arguments.get("image_path")
+    image_data = arguments.get("image_data")
+    image_uri = arguments.get("image_uri")
+    if sum(1 for v in (image_path, image_data, image_uri) if v) != 1:
+        raise ImageInputError("Provide exactly one of image_path, image_data or image_uri")
+
+    if image_path:
+        return image_path, image_path
+    label = arguments.get("name") or "inline image"
+    if image_data:
+        # Accept a plain base64 string or MCP blob contents ({"blob": ..., "mimeType": ...})
+        if isinstance(image_data, dict):
+            image_data = image_data.get("blob") or ""
+        return await asyncio.to_thread(_decode_base64, image_data), label
+
+    if image_uri.startswith("data:"):
+        return await asyncio.to_thread(_decode_data_uri, image_uri), label
+    parsed = urlparse(image_uri)
+    if parsed.scheme == "file":
+        path = url2pathname(unquote_to_bytes(parsed.path).decode("utf-8"))
+        return path, path
+    raise ImageInputError(f"Unsupported image URI scheme '{parsed.scheme}' (use data: or file:)")
+
+
+def _source_digest(source: str | bytes) -> str:
+    if isinstance(source, bytes):
+        return hashlib.sha256(source).hexdigest()
+    return file_digest(source)
+
+
+async def _cache_key(source: str | bytes, settings: dict) -> str:
+    # Hash off the event loop; large scans can take a while to read
+    digest = await asyncio.to_thread(_source_digest, source)
+    return OCRCache.make_key(digest, settings)
+
+
+async def _run_ocr(source: str | bytes, settings: dict, cache_mode: str,
+                   page: int | None = None, digest: str | None = None) -> tuple[str, dict]:
+    """Return OCR text and a timing report for ``source``, consulting the result cache"""
+    key = None
+    if cache is not None and cache_mode != "bypass":
+        if digest is None:
+            key = await _cache_key(source, settings)
+        else:
+            key = OCRCache.make_key(digest, settings if page is None else {**settings, "page": page})
+        if cache_mode == "use":
+            cached = await asyncio.to_thread(cache.get, key)
+            if cached is not None:
+                return cached, {"cached": True}
+    if "tiled" in settings:
+        extracted_text, report = await _ocr_tiled(source, settings)
+    else:
+        extracted_text, report = await engine.submit(_ocr_image, source, settings, engine.timeout, page)
+    if key is not None:
+        await asyncio.to_thread(cache.put, key, extracted_text)
+    return extracted_text, report
+
+async def _ocr_tiled(image: str | bytes, settings: dict) -> tuple[str, dict]:
+    """Split a huge image into overlapping tiles, OCR them in parallel and stitch the words"""
+    tiling = settings["tiled"]
+    start = time.perf_counter()
+    spill_dir = tempfile.mkdtemp(prefix="ocr_tiles_")
+    try:
+        source = await engine.submit(prepare_source, image, spill_dir, settings.get("target_dpi"))
+        boxes = plan_tiles(*source["size"], tiling["tile_size"], tiling["overlap"])
+        prepared = time.perf_counter()
+        # Keep the admission queue free for other callers while a poster is split up
+        window = asyncio.Semaphore(engine.max_inflight)
+
+        async def run_tile(box):
+            async with window:
+                return await engine.submit(
+                    _ocr_tile, source["source"], box, source["size"], settings["preprocess"],
+                    settings["lang"], _tesseract_config(settings), engine.timeout,
+                )
+
+        tile_words = await asyncio.gather(*(run_tile(box) for box in boxes))
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+    words = [word for words in tile_words for word in words]
+    kept = dedupe_words(words)
+    report = {
+        "tiles": len(boxes),
+        "tile_size": tiling["tile_size"],
+        "overlap": tiling["overlap"],
+        "image_size": source["size"],
+        "scale": source["scale"],
+        "spilled": source["spilled"],
+        "words": len(kept),
+        "duplicates_removed": len(words) - len(kept),
+        "prepare_ms": round((prepared - start) * 1000, 2),
+        "ocr_ms": round((time.perf_counter() - prepared) * 1000, 2),
+    }
+    if settings.get("output") == "words":
+        return ocr_words.to_json(words_to_columns(kept), *source["size"]), report
+    return words_to_text(kept), report
+
+
+async def _perform_ocr_document(arguments: dict) -> list[TextContent]:
+    """OCR a multi-page document, streaming each page's text as a progress notification"""
+    document_path = arguments.get("document_path", "")
+    cache_mode = arguments.get("cache") or "use"
+    if cache_mode not in CACHE_MODES:
+        return [TextContent(type="text", text=f"Error: Unknown cache mode '{cache_mode}'.")]
+    settings = _ocr_settings(arguments)
+    if is_pdf(document_path):
+        settings["pdf_dpi"] = int(arguments.get("dpi") or DEFAULT_PDF_DPI)
+
+    total = await asyncio.to_thread(page_count, document_path)
+    digest = None
+    if cache is not None and cache_mode != "bypass":
+        digest = await asyncio.to_thread(file_digest, document_path)
+
+    ctx = app.request_context
+    progress_token = ctx.meta.progressToken if ctx.meta else None
+    texts = [None] * total
+    done = 0
+    # Pages are dispatched in order, never more than the engine can run at once,
+    # so the admission queue is not flooded by a 500-page document
+    window = asyncio.Semaphore(engine.max_inflight)
+
+    async def run_page(index: int):
+        nonlocal done
+        async with window:
+            try:
+                text, _ = await _run_ocr(document_path, settings, cache_mode, page=index, digest=digest)
+            except (TesseractMissingError, EngineBusyError):
+                raise
+            except Exception as e:
+                text = f"[Error on page {index + 1}: {e}]"
+        texts[index] = text
+        done += 1
+        if progress_token is not None:
+            await ctx.session.send_progress_notification(
+                progress_token,
+                done,
+                total,
+                message=f"Page {index + 1}/{total}:\n{text}",
+                related_request_id=ctx.request_id,
+            )
+
+    pages = [asyncio.ensure_future(run_page(i)) for i in range(total)]
+    try:
+        await asyncio.gather(*pages)
+    except BaseException:
+        # A page that aborts the document stops the others before the error goes out
+        for page in pages:
+            page.cancel()
+        await asyncio.gather(*pages, return_exceptions=True)
+        raise
+    body = "\n\n".join(f"--- Page {i + 1} ---\n{text.strip()}" for i, text in enumerate(texts))
+    return [TextContent(
+        type="text",
+        text=f"OCR Results from '{document_path}' ({total} pages):\n\n{body}"
+    )]
+
 @app.call_tool()
-async def call_tool(name: str, arguments: dict) -> list[TextContent]:
+async def call_tool(name: str, arguments: dict) -> list[TextContent | EmbeddedResource]:
     """Handle tool calls"""
+    if name == "ocr_startup":
+        report = {
+            **STARTUP,
+            "ocr_loaded": HAS_OCR is not None,
+            "warmup_enabled": OCR_WARMUP,
+            "uptime_ms": round((time.perf_counter() - _STARTED) * 1000, 2),
+        }
+        return [TextContent(type="text", text=json.dumps(report, indent=2))]
+
+    _mark("first_request_ms")
+    try:
+        return await _handle_tool(name, arguments)
+    finally:
+        _mark("first_result_ms")
+
+
+async def _handle_tool(name: str, arguments: dict) -> list[TextContent | EmbeddedResource]:
+    await ocr_ready()
+    if name == "ocr_cache":
+        if cache is None:
+            return [TextContent(type="text", text="OCR result cache is disabled (OCR_CACHE=0)")]
+        if arguments.get("action", "stats") == "purge":
+            image_path = arguments.get("image_path")
+            if image_path:
+                if not Path(image_path).exists():
+                    return [TextContent(type="text", text=f"Error: Image file '{image_path}' not found.")]
+                if not HAS_OCR:
+                    # Cache keys use the OCR modules' defaults (target DPI, tile size)
+                    return [TextContent(
+                        type="text",
+                        text="Error: Purging one image's entry needs the OCR libraries; "
+                             "purge without image_path to clear the whole cache."
+                    )]
+                removed = await asyncio.to_thread(cache.purge, await _cache_key(image_path, _ocr_settings(arguments)))
+            else:
+                removed = await asyncio.to_thread(cache.purge)
+            return [TextContent(type="text", text=f"Purged {removed} cached OCR result(s)")]
+        return [TextContent(type="text", text=json.dumps(await asyncio.to_thread(cache.stats), indent=2))]
+
+    if name == "perform_ocr_document":
+        document_path = arguments.get("document_path", "")
+        if not Path(document_path).exists():
+            return [TextContent(type="text", text=f"Error: Document '{document_path}' not found.")]
+        if not HAS_OCR:
+            return [TextContent(
+                type="text",
+                text=f"Mock OCR result for '{document_path}' (OCR libraries not installed)\n\n"
+                     "Sample extracted text:\nInvoice #12345\nDate: 2024-01-15\nTotal: $123.45"
+            )]
+        try:
+            return await _perform_ocr_document(arguments)
+        except EngineBusyError as e:
+            return [TextContent(type="text", text=f"Error: {e}. Retry later.")]
+        except TesseractMissingError:
+            return [TextContent(
+                type="text",
+                text=f"Mock OCR result for '{document_path}' (Tesseract binary not found)\n\n"
+                     "Sample extracted text:\nInvoice #12345\nDate: 2024-01-15\nTotal: $123.45"
+            )]
+        except Exception as e:
+            return [TextContent(type="text", text=f"Error processing document '{document_path}': {str(e)}")]
+
     if name == "perform_ocr":
-        image_path = arguments.get("image_path", "")
+        image_path = arguments.get("image_path") or arguments.get("name") or "inline image"
+        cache_mode = arguments.get("cache") or "use"
+        if cache_mode not in CACHE_MODES:
+            return [TextContent(type="text", text=f"Error: Unknown cache mode '{cache_mode}'.")]
         
         try:
+            source, image_path = await _resolve_image(arguments)
+
             # Check if file exists
-            if not Path(image_path).exists():
+            if isinstance(source, str) and not Path(source).exists():
                 return [TextContent(
                     type="text",
                     text=f"Error: Image file '{image_path}' not found."
                 )]
             
             if HAS_OCR:
-                # Perform actual OCR
-                image = Image.open(image_path)
-                extracted_text = pytesseract.image_to_string(image)
-                
+                # Perform actual OCR in the worker pool (or serve it from the cache)
+                try:
+                    settings = _ocr_settings(arguments)
+                except ValueError as e:
+                    return [TextContent(type="text", text=f"Error: {e}.")]
+                unknown = set(settings["preprocess"]) - set(PREPROCESS_STEPS)
+                if unknown:
+                    return [TextContent(
+                        type="text",
+                        text=f"Error: Unknown preprocessing step(s): {', '.join(sorted(unknown))}."
+                    )]
+                if "tiled" in settings and set(settings["preprocess"]) - set(TILE_STEPS) - {"downscale"}:
+                    return [TextContent(
+                        type="text",
+                        text="Error: Tiled mode supports only the 'downscale', 'grayscale' and 'threshold' preprocessing steps."
+                    )]
+                extracted_text, report = await _run_ocr(source, settings, cache_mode)
+                extras = [TextContent(type="text", text=json.dumps(report))] \
+                    if settings["preprocess"] or "tiled" in settings else []
+
+                output = arguments.get("output") or "text"
+                if output == "columns":
+                    return [TextContent(type="text", text=extracted_text)] + extras
+                if output == "binary":
+                    payload = json.loads(extracted_text)
+                    blob = await asyncio.to_thread(ocr_words.pack, payload)
+                    return [
+                        TextContent(
+                            type="text",
+                            text=f"OCR word data from '{image_path}': {payload['count']} words "
+                                 f"({len(blob)} bytes, {ocr_words.MIME_TYPE})"
+                        ),
+                        EmbeddedResource(
+                            type="resource",
+                            resource=BlobResourceContents(
+                                uri=f"ocr://words/{quote(Path(image_path).name)}",
+                                mimeType=ocr_words.MIME_TYPE,
+                                blob=base64.b64encode(blob).decode("ascii"),
+                            ),
+                        ),
+                    ] + extras
+
                 if extracted_text.strip():
                     result = f"OCR Results from '{image_path}':\n\n{extracted_text}"
                 else:
                     result = f"No text found in image '{image_path}'"
+                if extras:
+                    return [TextContent(type="text", text=result)] + extras
             else:
                 # Fallback mock result
                 result = f"Mock OCR result for '{image_path}' (OCR libraries not installed)\n\nSample extracted text:\nInvoice #12345\nDate: 2024-01-15\nTotal: $123.45"
@@ -94,9 +873,18 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
                 type="text",
                 text=result
             )]
-        except getattr(sys.modules.get('pytesseract', None), 'TesseractNotFoundError', Exception) as e:
+        except ImageInputError as e:
+            return [TextContent(type="text", text=f"Error: {e}.")]
+        except EngineBusyError as e:
+            return [TextContent(type="text", text=f"Error: {e}. Retry later.")]
+        except asyncio.TimeoutError:
+            return [TextContent(
+                type="text",
+                text=f"Error processing image '{image_path}': OCR timed out after {engine.timeout:g}s"
+            )]
+        except (TesseractMissingError, getattr(sys.modules.get('pytesseract', None), 'TesseractNotFoundError', Exception)) as e:
             # If Tesseract binary is missing, provide a mock response for graceful degradation
-            if 'TesseractNotFoundError' in e.__class__.__name__:
+            if isinstance(e, TesseractMissingError) or 'TesseractNotFoundError' in e.__class__.__name__:
                 result = (
                     f"Mock OCR result for '{image_path}' (Tesseract binary not found)\n\n"
                     "Sample extracted text:\nInvoice #12345\nDate: 2024-01-15\nTotal: $123.45"
@@ -115,11 +903,40 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
     else:
         raise ValueError(f"Unknown tool: {name}")
 
+async def _warm_up():
+    """Background warm-up: load the OCR libraries, start the workers and run tesseract once in each"""
+    start = time.perf_counter()
+    if not await ocr_ready():
+        STARTUP["warmup"] = {"skipped": "OCR libraries unavailable or OCR_MOCK=1"}
+        return
+    loaded = time.perf_counter()
+    try:
+        workers = await engine.warm_up(_warm_worker, OCR_WARMUP_LANG)
+    except Exception as e:
+        STARTUP["warmup"] = {"error": str(e) or e.__class__.__name__}
+        return
+    tesseract = [w["tesseract_ms"] for w in workers if w["tesseract_ms"] is not None]
+    STARTUP["warmup"] = {
+        "lang": OCR_WARMUP_LANG,
+        "workers": len({w["pid"] for w in workers}),
+        "load_ms": round((loaded - start) * 1000, 2),
+        "pool_ms": round((time.perf_counter() - loaded) * 1000, 2),
+        "worker_imports_ms": max((w["imports_ms"] or 0) for w in workers),
+        "tesseract_first_run_ms": max(tesseract) if tesseract else None,
+        "errors": sorted({w["error"] for w in workers if "error" in w}),
+    }
+    _mark("warm_ms")
+
+
 async def main():
     """Run the server using stdio"""
+    warm_up = None
     try:
         # Use stdio for MCP communication
         async with stdio_server() as (read_stream, write_stream):
+            _mark("ready_ms")
+            if OCR_WARMUP:
+                warm_up = asyncio.create_task(_warm_up())
             await app.run(
                 read_stream,
                 write_stream,
@@ -130,6 +947,11 @@ async def main():
     except Exception as e:
         print(f"Server error: {e}", file=sys.stderr)
         raise
+    finally:
+        if warm_up is not None:
+            warm_up.cancel()
+        engine.shutdown()
 
 if __name__ == "__main__":
+    mcp_metrics.instrument(app)
     asyncio.run(main())
\ No newline at end of file
@@ -4,146 +4,566 @@ Single-file demo: MCP server provides an image + text resource,
 client fetches them and generates a PDF report.
 """
 
+from __future__ import annotations
+
 import sys
+import argparse
 import asyncio
 import base64
+import csv
+import hashlib
+import io
+import itertools
 import json
+import multiprocessing
 import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from dataclasses import replace
 from mcp.server.fastmcp import FastMCP
-from mcp.types import Resource
-from mcp.client.session import ClientSession
-from mcp.client.stdio import stdio_client, StdioServerParameters
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Image, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
+from mcp.types import BlobResourceContents
+
+# Shared transport options (stdio or a localhost HTTP/SSE daemon) and request metrics live at the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import mcp_metrics
+import mcp_transport
+
+# Optional: peak RSS for batch runs (Unix only)
+try:
+    import resource
+    HAS_RUSAGE = True
+except ImportError:
+    HAS_RUSAGE = False
+
+# Client-only dependencies (MCP client, reportlab, PyYAML) are imported on
+# first use. The server role, which --client spawns as a subprocess, then
+# starts without paying for them. None means "not loaded yet".
+HAS_CLIENT = None
+HAS_REPORTLAB = None
+
+def _load_client():
+    global HAS_CLIENT, ClientSession, stdio_client, StdioServerParameters
+    if HAS_CLIENT is None:
+        from mcp.client.session import ClientSession
+        from mcp.client.stdio import stdio_client, StdioServerParameters
+        HAS_CLIENT = True
+
+def _load_reportlab():
+    global HAS_REPORTLAB, A4, SimpleDocTemplate, Image, Paragraph, Spacer, getSampleStyleSheet
+    if HAS_REPORTLAB is None:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import SimpleDocTemplate, Image, Paragraph, Spacer
+        from reportlab.lib.styles import getSampleStyleSheet
+        HAS_REPORTLAB = True
 
 # --------------------------
 # MCP SERVER PART
 # --------------------------
-mcp = FastMCP("ReportServer")
+LOGO_URI = "resource://logo"
+LOGO_PATH = "logo.png"  # <- make sure logo.png exists
+
+class ReportServer(FastMCP):
+    """
+    FastMCP server that stamps logo reads with the logo's ETag.
+
+    The logo goes out as a plain blob; its ETag (and ``notModified`` for a
+    conditional read that matched) ride in the contents' ``_meta``.
+    """
+
+    async def read_resource(self, uri):
+        contents = await super().read_resource(uri)
+        uri = str(uri)
+        if uri != LOGO_URI and not uri.startswith(f"{LOGO_URI}/"):
+            return contents
+        etag = load_logo()["etag"]
+        return [
+            replace(c, meta={**(c.meta or {}), "etag": etag, "notModified": not c.content})
+            for c in contents
+        ]
+
+mcp = ReportServer("ReportServer")
 
 def load_image_as_base64(path: str) -> str:
     with open(path, "rb") as f:
         return base64.b64encode(f.read()).decode("utf-8")
 
+# Encoded logo payload, rebuilt only when the file's mtime or size changes
+_logo_cache = {}
+
+def load_logo() -> dict:
+    """Return the cached logo bytes and their ETag (content hash)"""
+    stat = os.stat(LOGO_PATH)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    if _logo_cache.get("stamp") != stamp:
+        with open(LOGO_PATH, "rb") as f:
+            data = f.read()
+        _logo_cache.update(stamp=stamp, etag=hashlib.sha256(data).hexdigest()[:32], data=data)
+    return _logo_cache
+
 # Image resource
-@mcp.resource("resource://logo")
-def logo_resource() -> Resource:
-    return Resource(
-        uri="resource://logo",
-        name="Company Logo",
-        description="Logo image in PNG format",
-        mimeType="image/png",
-        contents=[{
-            "type": "blob",
-            "mimeType": "image/png",
-            "data": load_image_as_base64("logo.png"),  # <- make sure logo.png exists
-        }],
-    )
+@mcp.resource(LOGO_URI, name="Company Logo", description="Logo image in PNG format", mime_type="image/png")
+def logo_resource() -> bytes:
+    # Raw bytes are sent as a blob; no per-read file I/O unless the file changed
+    return load_logo()["data"]
+
+# Conditional read: a client that already holds the logo sends its ETag
+# and gets an empty blob marked notModified instead of the image
+@mcp.resource(f"{LOGO_URI}/{{etag}}", mime_type="image/png")
+def logo_if_changed(etag: str) -> bytes:
+    logo = load_logo()
+    return b"" if etag == logo["etag"] else logo["data"]
 
 # Text resource
-@mcp.resource("resource://summary")
-def summary_resource() -> Resource:
-    return Resource(
-        uri="resource://summary",
-        name="Quarterly Summary",
-        description="Business summary text",
-        mimeType="text/plain",
-        contents=[{
-            "type": "text",
-            "text": "This quarter, revenue grew by 25%. Customer satisfaction improved to 92%.",
-        }],
-    )
+@mcp.resource("resource://summary", name="Quarterly Summary", description="Business summary text",
+              mime_type="text/plain")
+def summary_resource() -> str:
+    return "This quarter, revenue grew by 25%. Customer satisfaction improved to 92%."
+
+# KPI tool (used by report specs with tool sections)
+KPIS = {
+    "revenue_growth": "Revenue grew by 25% quarter over quarter.",
+    "customer_satisfaction": "Customer satisfaction reached 92%.",
+    "churn": "Customer churn fell to 3.1%.",
+}
+
+@mcp.tool()
+def kpi(metric: str) -> str:
+    """Return a one-line statement for a named KPI"""
+    if metric not in KPIS:
+        raise ValueError(f"Unknown KPI '{metric}' (use {', '.join(KPIS)})")
+    return KPIS[metric]
 
 # --------------------------
 # MCP CLIENT PART
 # --------------------------
-async def run_client():
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", ".report_cache")
+
+class ResourceCache:
+    """
+    Decoded resource bodies keyed by ETag, kept in memory and on disk.
+
+    The on-disk copy lets the next run send its ETag and skip the transfer
+    when the server's copy is unchanged.
+    """
+
+    def __init__(self, directory: str | None = REPORT_CACHE_DIR):
+        self.directory = directory
+        self._bodies = {}  # etag -> decoded bytes
+        self._etags = None  # uri -> etag
+
+    def _index(self) -> dict:
+        if self._etags is None:
+            self._etags = {}
+            if self.directory:
+                try:
+                    with open(os.path.join(self.directory, "etags.json"), "r", encoding="utf-8") as f:
+                        self._etags = json.load(f)
+                except (OSError, ValueError):
+                    pass
+        return self._etags
+
+    def etag(self, uri: str) -> str | None:
+        """ETag to revalidate ``uri`` with, if its decoded body is still available"""
+        etag = self._index().get(uri)
+        return etag if etag and self.get(etag) is not None else None
+
+    def get(self, etag: str) -> bytes | None:
+        body = self._bodies.get(etag)
+        if body is None and self.directory and _is_etag(etag):
+            try:
+                with open(os.path.join(self.directory, etag), "rb") as f:
+                    body = self._bodies[etag] = f.read()
+            except OSError:
+                pass
+        return body
+
+    def put(self, uri: str, etag: str, body: bytes):
+        self._bodies[etag] = body
+        self._index()[uri] = etag
+        if self.directory and _is_etag(etag):
+            os.makedirs(self.directory, exist_ok=True)
+            _write_atomic(os.path.join(self.directory, etag), body)
+            _write_atomic(os.path.join(self.directory, "etags.json"), json.dumps(self._etags).encode("utf-8"))
+
+def _is_etag(etag: str) -> bool:
+    # ETags become file names; accept only the hex digests the server sends
+    return 8 <= len(etag) <= 64 and all(c in "0123456789abcdef" for c in etag)
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def decode_resource(result) -> dict:
+    """
+    Decode a ``read_resource`` result in a single pass over its contents.
+
+    Blob contents are base64-decoded once into bytes and text is taken as
+    is; the ETag and ``notModified`` flag come from the contents' ``_meta``.
+    Returns ``{"data", "text", "mime_type", "etag", "not_modified"}``.
+    """
+    decoded = {"data": None, "text": "", "mime_type": None, "etag": None, "not_modified": False}
+    for item in result.contents:
+        decoded["mime_type"] = decoded["mime_type"] or item.mimeType
+        meta = item.meta or {}
+        decoded["etag"] = meta.get("etag") or decoded["etag"]
+        decoded["not_modified"] = decoded["not_modified"] or bool(meta.get("notModified"))
+        if isinstance(item, BlobResourceContents):
+            if item.blob:
+                decoded["data"] = base64.b64decode(item.blob)
+        else:
+            decoded["text"] += item.text
+    return decoded
+
+async def fetch_resource(session: ClientSession, uri: str, cache: ResourceCache) -> dict:
+    """
+    Read and decode ``uri``, revalidating against ``cache`` when possible.
+
+    A resource whose last response carried an ETag is read through its
+    conditional ``{uri}/{etag}`` form; an unchanged body is served from
+    the cache without re-transfer.
+    """
+    cached_etag = cache.etag(uri)
+    decoded = decode_resource(await session.read_resource(f"{uri}/{cached_etag}" if cached_etag else uri))
+    if decoded["not_modified"]:
+        decoded["data"] = cache.get(cached_etag)
+    elif decoded["data"] and decoded["etag"]:
+        cache.put(uri, decoded["etag"], decoded["data"])
+    return decoded
+
+async def call_tool(session: ClientSession, name: str, arguments: dict) -> dict:
+    """Call a tool and decode its content into the same shape as ``decode_resource``"""
+    result = await session.call_tool(name, arguments)
+    if result.isError:
+        raise RuntimeError(result.content[0].text if result.content else f"Tool '{name}' failed")
+    decoded = {"data": None, "text": "", "mime_type": None, "etag": None, "not_modified": False}
+    for item in result.content:
+        if item.type == "image":
+            decoded["data"] = base64.b64decode(item.data)
+            decoded["mime_type"] = item.mimeType
+        elif item.type == "text":
+            decoded["text"] += item.text
+    return decoded
+
+# --------------------------
+# REPORT SPECS
+# --------------------------
+# A spec lists sections in page order. Each section has a ``type`` and
+# takes its content from ``text``, a ``resource`` URI or a ``tool`` call:
+#   image      - resource/tool returning an image; optional width, height
+#   title      - heading text (style "Title" unless ``style`` is given)
+#   paragraph  - body text (style "Normal" unless ``style`` is given)
+#   spacer     - vertical gap of ``height`` points
+MAX_IN_FLIGHT = int(os.getenv("REPORT_MAX_IN_FLIGHT", "8"))
+
+DEFAULT_SPEC = {
+    "output": "report.pdf",
+    "sections": [
+        {"type": "image", "resource": "resource://logo", "width": 120, "height": 60},
+        {"type": "spacer", "height": 20},
+        {"type": "title", "text": "Quarterly Report"},
+        {"type": "spacer", "height": 12},
+        {"type": "paragraph", "resource": "resource://summary"},
+        {"type": "spacer", "height": 12},
+        {"type": "paragraph", "text": "Report generated using MCP resources.", "style": "Italic"},
+    ],
+}
+
+def load_spec(path: str) -> dict:
+    """Load a report spec from a YAML (.yaml/.yml) or JSON file"""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("PyYAML is required for YAML report specs (pip install pyyaml)") from None
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+    if not isinstance(spec, dict) or not isinstance(spec.get("sections"), list):
+        raise ValueError(f"Report spec {path} needs a 'sections' list")
+    return spec
+
+async def fetch_sections(session: ClientSession, sections: list, cache: ResourceCache,
+                         max_in_flight: int = MAX_IN_FLIGHT) -> list:
+    """
+    Fetch every section's content concurrently, at most ``max_in_flight`` at once.
+
+    Returns one decoded result per section, in spec order (None for
+    sections with inline text or no content). Identical sources are
+    fetched once.
+    """
+    limit = asyncio.Semaphore(max(1, max_in_flight))
+    pending = {}
+
+    async def fetch(section: dict) -> dict:
+        async with limit:
+            if "resource" in section:
+                return await fetch_resource(session, section["resource"], cache)
+            return await call_tool(session, section["tool"], section.get("arguments") or {})
+
+    def source(section: dict):
+        if "resource" not in section and "tool" not in section:
+            return None
+        key = json.dumps([section.get("resource"), section.get("tool"), section.get("arguments")], sort_keys=True)
+        if key not in pending:
+            pending[key] = asyncio.ensure_future(fetch(section))
+        return pending[key]
+
+    futures = [source(section) for section in sections]
+    try:
+        await asyncio.gather(*pending.values())
+    except Exception:
+        for future in pending.values():
+            future.cancel()
+        raise
+    return [future.result() if future is not None else None for future in futures]
+
+class _Fields(dict):
+    # Unknown {placeholders} are left in the text instead of raising
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+def build_story(sections: list, fetched: list, fields: dict | None = None) -> list:
+    """
+    Turn spec sections and their fetched content into reportlab flowables.
+
+    With ``fields`` (one batch customer), ``{placeholders}`` in inline
+    text are filled from it.
+    """
+    _load_reportlab()
+    styles = getSampleStyleSheet()
+    story = []
+    for number, (section, content) in enumerate(zip(sections, fetched), start=1):
+        kind = section.get("type", "paragraph")
+        if kind == "spacer":
+            story.append(Spacer(1, section.get("height", 12)))
+        elif kind == "image":
+            if content and content.get("path"):
+                # Spooled by a batch run: opened only while the page is drawn
+                story.append(Image(content["path"], width=section.get("width"),
+                                   height=section.get("height"), lazy=2))
+            elif content and content["data"]:
+                # reportlab reads the image from memory; no temp file on disk
+                story.append(Image(io.BytesIO(content["data"]), width=section.get("width"),
+                                   height=section.get("height")))
+        elif kind in ("title", "paragraph"):
+            text = section.get("text", content["text"] if content else "")
+            if fields is not None and "text" in section:
+                text = text.format_map(_Fields(fields))
+            style = section.get("style", "Title" if kind == "title" else "Normal")
+            story.append(Paragraph(text, styles[style]))
+        else:
+            raise ValueError(f"Section {number}: unknown type '{kind}'")
+    return story
+
+def render_pdf(path: str, sections: list, fetched: list, fields: dict | None = None):
+    """Lay out the sections and write the PDF to ``path``"""
+    story = build_story(sections, fetched, fields)
+    SimpleDocTemplate(path, pagesize=A4).build(story)
+
+async def fetch_spec(spec: dict) -> list:
+    """Start the server, fetch every section of ``spec`` concurrently and return the results"""
+    _load_client()
     params = StdioServerParameters(command=sys.executable, args=[__file__])
     async with stdio_client(params) as (read_stream, write_stream):
         async with ClientSession(read_stream, write_stream) as session:
             await session.initialize()
+            return await fetch_sections(session, spec["sections"], ResourceCache(),
+                                        spec.get("max_in_flight", MAX_IN_FLIGHT))
 
-            # ---- Fetch logo ----
-            logo_res = await session.read_resource("resource://logo")
-            logo_data = None
-            # Normalize contents regardless of SDK return type
-            contents = []
-            if hasattr(logo_res, "model_dump"):
-                try:
-                    contents = logo_res.model_dump().get("contents", [])
-                except Exception:
-                    contents = []
-            if not contents:
-                contents = getattr(logo_res, "contents", [])
-            if not contents and isinstance(logo_res, dict):
-                contents = logo_res.get("contents", [])
-
-            # First pass: look for direct blob
-            for c in contents:
-                ctype = getattr(c, "type", None) if hasattr(c, "type") else (c.get("type") if isinstance(c, dict) else None)
-                if ctype == "blob":
-                    logo_data = getattr(c, "data", None) if hasattr(c, "data") else (c.get("data") if isinstance(c, dict) else None)
-                    if logo_data:
-                        break
-
-            # Second pass: sometimes a text/plain content has JSON with nested contents
-            if not logo_data:
-                for c in contents:
-                    text_val = getattr(c, "text", None) if hasattr(c, "text") else (c.get("text") if isinstance(c, dict) else None)
-                    if text_val:
-                        try:
-                            payload = json.loads(text_val)
-                            inner_contents = payload.get("contents", [])
-                            for ic in inner_contents:
-                                if (isinstance(ic, dict) and ic.get("type") == "blob") or (hasattr(ic, "type") and getattr(ic, "type") == "blob"):
-                                    logo_data = ic.get("data") if isinstance(ic, dict) else getattr(ic, "data", None)
-                                    if logo_data:
-                                        break
-                            if logo_data:
-                                break
-                        except Exception:
-                            continue
-
-            logo_path = None
-            if logo_data:
-                logo_bytes = base64.b64decode(logo_data)
-                logo_path = os.path.abspath("logo_tmp.png")
-                with open(logo_path, "wb") as f:
-                    f.write(logo_bytes)
-
-            # ---- Fetch summary ----
-            summary_res = await session.read_resource("resource://summary")
-            summary_text = ""
-            for c in getattr(summary_res, "contents", []):
-                if getattr(c, "type", None) == "text":
-                    summary_text = getattr(c, "text", "")
-
-            # ---- Generate PDF ----
-            doc = SimpleDocTemplate("report.pdf", pagesize=A4)
-            styles = getSampleStyleSheet()
-            story = []
-
-            if logo_path and os.path.exists(logo_path):
-                story.append(Image(logo_path, width=120, height=60))
-                story.append(Spacer(1, 20))
-
-            story.append(Paragraph("Quarterly Report", styles["Title"]))
-            story.append(Spacer(1, 12))
-            story.append(Paragraph(summary_text, styles["Normal"]))
-            story.append(Spacer(1, 12))
-            story.append(Paragraph("Report generated using MCP resources.", styles["Italic"]))
-
-            doc.build(story)
-            print("PDF report generated as report.pdf")
+async def run_client(spec_path: str | None = None):
+    spec = load_spec(spec_path) if spec_path else DEFAULT_SPEC
+
+    # ---- Fetch all sections concurrently ----
+    sections = spec["sections"]
+    fetched = await fetch_spec(spec)
+
+    # ---- Generate PDF (sections in spec order) ----
+    output = spec.get("output", "report.pdf")
+    render_pdf(output, sections, fetched)
+    print(f"PDF report generated as {output}")
+
+# --------------------------
+# BATCH RENDERING
+# --------------------------
+# One personalized report per customer. Resource and tool sections are
+# fetched once. Binary content (images) is spooled to files that workers
+# open only while drawing a page; only the paths and the (small) text go
+# to each worker, once, through the pool initializer. Inline text may use
+# {placeholders} filled from the customer's fields.
+BATCH_WORKERS = int(os.getenv("REPORT_WORKERS", "0")) or os.cpu_count() or 1
+BATCH_CHUNK = int(os.getenv("REPORT_BATCH_CHUNK", "25"))
+DEFAULT_OUTPUT_NAME = "report_{row}.pdf"
+MAX_REPORTED_FAILURES = 100
+
+def iter_customers(path: str):
+    """Yield ``(row_number, fields)`` from a CSV (with header) or JSON Lines file, one row at a time"""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+        elif f.read(1) == "[":
+            # A JSON array has to be parsed whole; use JSON Lines for large batches
+            f.seek(0)
+            rows = iter(json.load(f))
+        else:
+            f.seek(0)
+            rows = (json.loads(line) for line in f if line.strip())
+        for number, row in enumerate(rows, start=1):
+            yield number, row
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process in MB (None where unavailable)"""
+    if not HAS_RUSAGE:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def spool_sections(fetched: list, directory: str) -> list:
+    """
+    Move fetched binary content to files in ``directory``.
+
+    Returns the fetched list with each ``data`` replaced by the ``path``
+    of its file, so worker processes neither receive nor keep the bytes.
+    Sections fetched from the same source share one file.
+    """
+    spooled, paths = [], {}
+    for content in fetched:
+        if not content or not content["data"]:
+            spooled.append(content)
+            continue
+        key = id(content["data"])
+        if key not in paths:
+            paths[key] = os.path.join(directory, f"section_{len(paths)}")
+            with open(paths[key], "wb") as f:
+                f.write(content["data"])
+        spooled.append({**content, "data": None, "path": paths[key]})
+    return spooled
+
+_batch = {}
+
+def _init_batch_worker(sections: list, fetched: list, out_dir: str, output_name: str):
+    _batch.update(sections=sections, fetched=fetched, out_dir=out_dir, output_name=output_name)
+
+def _output_path(row: int, fields: dict) -> str:
+    name = _batch["output_name"].format_map(_Fields(fields, row=row))
+    name = re.sub(r"[^\w.-]+", "_", name).strip("_") or f"report_{row}.pdf"
+    if not name.lower().endswith(".pdf"):
+        name += ".pdf"
+    return os.path.join(_batch["out_dir"], name)
+
+def _render_reports(chunk: list) -> tuple:
+    """Worker: render a chunk of customers straight to disk; returns (results, peak RSS MB)"""
+    results = []
+    for row, fields in chunk:
+        try:
+            path = _output_path(row, fields)
+            render_pdf(path, _batch["sections"], _batch["fetched"], fields)
+            results.append((row, path, None))
+        except Exception as e:
+            results.append((row, None, str(e) or e.__class__.__name__))
+    return results, peak_rss_mb()
+
+def run_batch(customers_path: str, spec_path: str | None = None, out_dir: str = "reports",
+              workers: int = BATCH_WORKERS) -> dict:
+    """
+    Render one report per customer in a process pool.
+
+    The customer file is read lazily and at most two chunks per worker
+    are in flight, so memory stays flat however many customers there are;
+    each PDF is written straight to ``out_dir``. Fetched images are spooled
+    to a temporary directory for the duration of the run.
+    """
+    spec = load_spec(spec_path) if spec_path else DEFAULT_SPEC
+    started = time.perf_counter()
+    spool_dir = tempfile.mkdtemp(prefix="report_batch_")
+    try:
+        fetched = spool_sections(asyncio.run(fetch_spec(spec)), spool_dir)
+        fetch_s = time.perf_counter() - started
+        summary, worker_rss = _render_batch(spec, fetched, customers_path, out_dir, workers)
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+    elapsed = time.perf_counter() - started
+    summary.update(
+        fetch_s=round(fetch_s, 3),
+        elapsed_s=round(elapsed, 3),
+        reports_per_s=round(summary["reports"] / elapsed, 2) if elapsed else None,
+        peak_rss_mb={
+            "parent": peak_rss_mb(),
+            "worker_max": max((r for r in worker_rss if r is not None), default=None),
+        },
+    )
+    return summary
+
+def _render_batch(spec: dict, fetched: list, customers_path: str, out_dir: str, workers: int) -> tuple:
+    """Feed customer chunks to the worker pool; returns (summary, per-chunk worker peak RSS)"""
+    os.makedirs(out_dir, exist_ok=True)
+    workers = max(1, workers)
+    summary = {"reports": 0, "failed": 0, "failures": [], "workers": workers, "out_dir": os.path.abspath(out_dir)}
+    worker_rss = []
+    rows = iter_customers(customers_path)
+
+    def next_chunk():
+        return list(itertools.islice(rows, BATCH_CHUNK))
+
+    # Spawn, not fork: workers must not inherit the parent's MCP transport
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_batch_worker,
+        initargs=(spec["sections"], fetched, out_dir, spec.get("output_name", DEFAULT_OUTPUT_NAME)),
+    ) as pool:
+        in_flight = set()
+        while True:
+            while len(in_flight) < 2 * workers:
+                chunk = next_chunk()
+                if not chunk:
+                    break
+                in_flight.add(pool.submit(_render_reports, chunk))
+            if not in_flight:
+                break
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                results, rss = future.result()
+                worker_rss.append(rss)
+                for row, path, error in results:
+                    if error is None:
+                        summary["reports"] += 1
+                    else:
+                        summary["failed"] += 1
+                        if len(summary["failures"]) < MAX_REPORTED_FAILURES:
+                            summary["failures"].append({"row": row, "error": error})
+    return summary, worker_rss
 
+def batch_main(argv: list):
+    parser = argparse.ArgumentParser(prog="image.py --batch", description="Render one report per customer")
+    parser.add_argument("customers", help="CSV (with header) or JSON Lines file, one customer per row")
+    parser.add_argument("--spec", help="Report spec (YAML or JSON); defaults to the quarterly report")
+    parser.add_argument("--out", default="reports", help="Output directory (default: reports)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Worker processes")
+    args = parser.parse_args(argv)
+    summary = run_batch(args.customers, args.spec, args.out, args.workers)
+    print(json.dumps(summary, indent=2))
+    print(f"{summary['reports']} reports ({summary['failed']} failed) in {summary['elapsed_s']}s: "
+          f"{summary['reports_per_s']} reports/sec, peak RSS {summary['peak_rss_mb']['worker_max']} MB per worker")
 
 # --------------------------
 # ENTRYPOINT
 # --------------------------
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "--client":
-        asyncio.run(run_client())
+        asyncio.run(run_client(sys.argv[2] if len(sys.argv) > 2 else None))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        batch_main(sys.argv[2:])
     else:
-        print("Starting MCP server... (resources: logo, summary)")
-        mcp.run()
+        # stdout carries the MCP stdio protocol, so log to stderr
+        print("Starting MCP server... (resources: logo, summary; tools: kpi)", file=sys.stderr)
+        mcp_metrics.instrument(mcp)
+        mcp_transport.run(mcp)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Import-time and time-to-handshake profile of the MCP servers in this repository
+
+For each server entry point this spawns the server over stdio the way a
+client does and times it until ``initialize`` returns (median of --runs).
+One more run uses ``python -X importtime`` with the server's stderr
+captured, and reports the total import time plus the top-level modules
+that cost the most, so a heavy import creeping into a server is visible.
+
+    python import_profile.py                       # all servers
+    python import_profile.py report certificate    # a subset
+    python import_profile.py --runs 5 --top 8 --json import_profile.json
+
+With --budget MS it exits non-zero when a server's median handshake is
+slower, so it can run as a check.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+REPO_ROOT = Path(__file__).resolve().parent
+
+# Server entry points: name -> script (run with its own folder as cwd)
+SERVERS = {
+    "server_a": REPO_ROOT / "MCP_Basics" / "Multiple_Servers" / "mcp_server_a.py",
+    "server_b": REPO_ROOT / "MCP_Basics" / "Multiple_Servers" / "mcp_server_b.py",
+    "prompts": REPO_ROOT / "MCP_Basics" / "Prompts_Resources" / "Prompts" / "server.py",
+    "resources": REPO_ROOT / "MCP_Basics" / "Prompts_Resources" / "Resources" / "mcp_server.py",
+    "report": REPO_ROOT / "Report_Generator" / "image.py",
+    "certificate": REPO_ROOT / "Certificate_Creator" / "certificate_server.py",
+    "ocr": REPO_ROOT / "OCR_Usecase" / "working_ocr_server.py",
+    "gateway": REPO_ROOT / "MCP_Gateway" / "gateway_server.py",
+}
+
+HANDSHAKE_TIMEOUT = float(os.getenv("IMPORT_PROFILE_TIMEOUT", "120"))
+
+
+def server_params(script: Path, *python_flags: str) -> StdioServerParameters:
+    return StdioServerParameters(
+        command=sys.executable,
+        args=[*python_flags, str(script)],
+        cwd=str(script.parent),
+        env=dict(os.environ),
+    )
+
+
+async def handshake(params: StdioServerParameters, errlog=sys.stderr) -> float:
+    """Seconds from spawning the server until initialize returns"""
+    start = time.perf_counter()
+    async with stdio_client(params, errlog=errlog) as (read, write):
+        async with ClientSession(read, write) as session:
+            await asyncio.wait_for(session.initialize(), HANDSHAKE_TIMEOUT)
+            return time.perf_counter() - start
+
+
+def parse_importtime(text: str) -> list:
+    """``-X importtime`` lines -> [(module, self_us, cumulative_us, depth)]"""
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return rows
+
+
+async def profile(name: str, script: Path, runs: int, top: int) -> dict:
+    with open(os.devnull, "w") as devnull:
+        timings = [await handshake(server_params(script), errlog=devnull) for _ in range(runs)]
+
+    # One extra run with -X importtime; the report goes to the server's stderr
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as errlog:
+        await handshake(server_params(script, "-X", "importtime"), errlog=errlog)
+        errlog.seek(0)
+        rows = parse_importtime(errlog.read())
+
+    # depth 0 rows are the modules the server imported directly (or via site)
+    roots = sorted((r for r in rows if r[3] == 0), key=lambda r: r[2], reverse=True)
+    return {
+        "server": name,
+        "handshake_ms": round(statistics.median(timings) * 1000, 1),
+        "handshake_runs_ms": [round(t * 1000, 1) for t in timings],
+        "import_ms": round(sum(r[2] for r in roots) / 1000, 1),
+        "modules": len(rows),
+        "top_imports": [{"module": m, "cumulative_ms": round(c / 1000, 1)} for m, _, c, _ in roots[:top]],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Import time and time-to-handshake of each MCP server")
+    parser.add_argument("servers", nargs="*", metavar="server",
+                        help=f"servers to profile (default: all of {', '.join(SERVERS)})")
+    parser.add_argument("--runs", type=int, default=3, help="handshakes per server (median reported)")
+    parser.add_argument("--top", type=int, default=5, help="top-level imports listed per server")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    parser.add_argument("--budget", type=float, metavar="MS", help="fail if a median handshake is slower")
+    args = parser.parse_args()
+    unknown = [n for n in args.servers if n not in SERVERS]
+    if unknown:
+        parser.error(f"unknown server(s) {', '.join(unknown)} (use {', '.join(SERVERS)})")
+
+    reports, failed = [], {}
+    for name in args.servers or SERVERS:
+        if not SERVERS[name].is_file():
+            failed[name] = f"missing entry point {SERVERS[name]}"
+            print(f"\n{name}: failed ({failed[name]})")
+            continue
+        try:
+            report = await profile(name, SERVERS[name], max(1, args.runs), args.top)
+        except Exception as e:
+            failed[name] = str(e) or e.__class__.__name__
+            print(f"\n{name}: failed ({failed[name]})")
+            continue
+        reports.append(report)
+        print(f"\n{name}: handshake {report['handshake_ms']:.0f} ms (median of {len(report['handshake_runs_ms'])}), "
+              f"imports {report['import_ms']:.0f} ms across {report['modules']} modules")
+        for item in report["top_imports"]:
+            print(f"  {item['cumulative_ms']:8.1f} ms  {item['module']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "servers": reports, "failed": failed}, f, indent=2)
+        print(f"\nReport written to {args.json}")
+
+    over = [r["server"] for r in reports if args.budget and r["handshake_ms"] > args.budget]
+    if over:
+        print(f"\nOver the {args.budget:g} ms budget: {', '.join(over)}")
+    return 1 if failed or over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Request latency metrics for the MCP servers in this repository
+
+``instrument(server)`` wraps every request handler of a FastMCP or
+low-level ``Server`` once, so prompts, resources and tools are measured
+without per-handler code. For each method and target (tool name, prompt
+name or resource URI) it records a latency histogram, in-flight count,
+response payload size and error count (exceptions plus tool results with
+``isError``).
+
+The numbers are served as JSON from ``resource://metrics`` and, when
+MCP_METRICS_PROM names a file, written there in Prometheus text format
+every MCP_METRICS_INTERVAL_S seconds and at exit (e.g. for node_exporter's
+textfile collector). Set MCP_METRICS=0 to leave a server uninstrumented.
+"""
+
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+
+from mcp import types
+
+ENABLED = os.getenv("MCP_METRICS", "1") == "1"
+PROM_PATH = os.getenv("MCP_METRICS_PROM", "")
+PROM_INTERVAL_S = float(os.getenv("MCP_METRICS_INTERVAL_S", "15"))
+
+METRICS_URI = "resource://metrics"
+# Upper bounds (ms) of the latency buckets; the last bucket is unbounded
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+# Distinct targets kept per method (templated URIs can be unbounded); the rest share "<other>"
+MAX_TARGETS = 200
+
+
+class Histogram:
+    """
+    Latency histogram over the fixed BUCKETS_MS.
+
+    Also used by Certificate_Creator/certificate_metrics.py; fixed buckets
+    let snapshots from worker processes be merged by adding counts.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+
+    def add(self, ms: float):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.total += 1
+        self.sum_ms += ms
+        self.min_ms = ms if self.min_ms is None else min(self.min_ms, ms)
+        self.max_ms = ms if self.max_ms is None else max(self.max_ms, ms)
+
+    def merge(self, other: dict):
+        """Fold in another histogram's ``raw()`` snapshot"""
+        for i, n in enumerate(other["counts"]):
+            self.counts[i] += n
+        self.total += other["total"]
+        self.sum_ms += other["sum_ms"]
+        for attr, pick in (("min_ms", min), ("max_ms", max)):
+            theirs, ours = other[attr], getattr(self, attr)
+            if theirs is not None:
+                setattr(self, attr, theirs if ours is None else pick(ours, theirs))
+
+    def percentile(self, pct: float) -> float | None:
+        """Upper bound of the bucket holding the ``pct``-th percentile"""
+        if not self.total:
+            return None
+        rank, seen = pct / 100 * self.total, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def raw(self) -> dict:
+        return {"counts": list(self.counts), "total": self.total, "sum_ms": self.sum_ms,
+                "min_ms": self.min_ms, "max_ms": self.max_ms}
+
+    def summary(self) -> dict:
+        def r(v):
+            return round(v, 3) if v is not None else None
+        return {
+            "count": self.total,
+            "sum_ms": r(self.sum_ms),
+            "mean_ms": r(self.sum_ms / self.total) if self.total else None,
+            "min_ms": r(self.min_ms),
+            "max_ms": r(self.max_ms),
+            "p50_ms": r(self.percentile(50)),
+            "p95_ms": r(self.percentile(95)),
+            "p99_ms": r(self.percentile(99)),
+            "buckets": {
+                (f"le_{b:g}" if i < len(BUCKETS_MS) else "inf"): n
+                for i, (b, n) in enumerate(zip(BUCKETS_MS + (None,), self.counts)) if n
+            },
+        }
+
+
+class Series(Histogram):
+    """Latency histogram plus request counters for one (method, target)"""
+
+    def __init__(self):
+        super().__init__()
+        self.errors = 0
+        self.in_flight = 0
+        self.bytes_sum = 0
+        self.bytes_max = 0
+
+    def summary(self) -> dict:
+        latency = super().summary()
+        return {
+            "count": self.total,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            **{k: latency[k] for k in ("mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")},
+            "bytes_mean": round(self.bytes_sum / self.total) if self.total else None,
+            "bytes_max": self.bytes_max,
+        }
+
+
+class Metrics:
+    def __init__(self, server_name: str):
+        self.server_name = server_name
+        self.started = time.time()
+        self._series = {}  # (method, target) -> Series
+        self._targets = {}  # method -> set of targets seen
+        self._lock = threading.Lock()  # the Prometheus dump runs on its own thread
+
+    def series(self, method: str, target: str) -> Series:
+        with self._lock:
+            seen = self._targets.setdefault(method, set())
+            if target not in seen:
+                if len(seen) >= MAX_TARGETS:
+                    target = "<other>"
+                seen.add(target)
+            return self._series.setdefault((method, target), Series())
+
+    def observe(self, series: Series, ms: float, payload_bytes: int, error: bool):
+        with self._lock:
+            series.add(ms)
+            series.bytes_sum += payload_bytes
+            series.bytes_max = max(series.bytes_max, payload_bytes)
+            series.errors += error
+
+    def report(self) -> dict:
+        with self._lock:
+            methods = {}
+            for (method, target), series in sorted(self._series.items()):
+                methods.setdefault(method, {})[target] = series.summary()
+            return {
+                "server": self.server_name,
+                "uptime_s": round(time.time() - self.started, 1),
+                "in_flight": sum(s.in_flight for s in self._series.values()),
+                "methods": methods,
+            }
+
+    def prometheus(self) -> str:
+        """All series in Prometheus text exposition format"""
+        lines = {
+            "duration": ["# HELP mcp_request_duration_seconds MCP request latency",
+                         "# TYPE mcp_request_duration_seconds histogram"],
+            "in_flight": ["# HELP mcp_requests_in_flight MCP requests being handled",
+                          "# TYPE mcp_requests_in_flight gauge"],
+            "errors": ["# HELP mcp_request_errors_total MCP requests that failed",
+                       "# TYPE mcp_request_errors_total counter"],
+            "bytes": ["# HELP mcp_response_bytes_total Payload bytes returned by MCP requests",
+                      "# TYPE mcp_response_bytes_total counter"],
+        }
+        with self._lock:
+            for (method, target), s in sorted(self._series.items()):
+                labels = f'server="{_escape(self.server_name)}",method="{method}",target="{_escape(target)}"'
+                cumulative = 0
+                for bound, n in zip(BUCKETS_MS, s.counts):
+                    cumulative += n
+                    lines["duration"].append(f'mcp_request_duration_seconds_bucket{{{labels},le="{bound / 1000:g}"}} {cumulative}')
+                lines["duration"].append(f'mcp_request_duration_seconds_bucket{{{labels},le="+Inf"}} {s.total}')
+                lines["duration"].append(f"mcp_request_duration_seconds_sum{{{labels}}} {s.sum_ms / 1000:.6f}")
+                lines["duration"].append(f"mcp_request_duration_seconds_count{{{labels}}} {s.total}")
+                lines["in_flight"].append(f"mcp_requests_in_flight{{{labels}}} {s.in_flight}")
+                lines["errors"].append(f"mcp_request_errors_total{{{labels}}} {s.errors}")
+                lines["bytes"].append(f"mcp_response_bytes_total{{{labels}}} {s.bytes_sum}")
+        return "\n".join(line for group in lines.values() for line in group) + "\n"
+
+    def dump(self, path: str):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp_path, path)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _target(request) -> str:
+    params = getattr(request, "params", None)
+    for field in ("name", "uri"):
+        value = getattr(params, field, None)
+        if value is not None:
+            return str(value)
+    return ""
+
+
+def _payload_bytes(result) -> int:
+    """Size of the text and base64 data in a result, without re-serializing it"""
+    root = getattr(result, "root", result)
+    items = (getattr(root, "content", None) or getattr(root, "contents", None)
+             or [m.content for m in getattr(root, "messages", None) or []])
+    size = 0
+    for item in items:
+        for field in ("text", "blob", "data"):
+            value = getattr(item, field, None)
+            if isinstance(value, str):
+                size += len(value)
+        inner = getattr(item, "resource", None)  # embedded resources
+        if inner is not None:
+            size += len(getattr(inner, "text", None) or getattr(inner, "blob", None) or "")
+    return size
+
+
+def _wrap(handler, metrics: Metrics):
+    async def instrumented(request):
+        if request is None:
+            # Internal call (the low-level server lists tools to validate a call); not a client request
+            return await handler(request)
+        series = metrics.series(request.method, _target(request))
+        series.in_flight += 1
+        start = time.perf_counter()
+        result, error = None, True
+        try:
+            result = await handler(request)
+            error = bool(getattr(getattr(result, "root", None), "isError", False))
+            return result
+        finally:
+            series.in_flight -= 1
+            metrics.observe(series, (time.perf_counter() - start) * 1000,
+                            _payload_bytes(result) if result is not None else 0, error)
+    return instrumented
+
+
+def instrument(server) -> Metrics | None:
+    """
+    Measure every request handled by ``server`` (FastMCP or low-level Server).
+
+    Call once, after the server's handlers are registered and before it
+    runs. Adds ``resource://metrics`` to the server's resources.
+    """
+    if not ENABLED:
+        return None
+    low = getattr(server, "_mcp_server", server)
+    metrics = Metrics(low.name)
+    for request_type, handler in list(low.request_handlers.items()):
+        low.request_handlers[request_type] = _wrap(handler, metrics)
+
+    list_resources = low.request_handlers.get(types.ListResourcesRequest)
+    read_resource = low.request_handlers.get(types.ReadResourceRequest)
+    metrics_resource = types.Resource(uri=METRICS_URI, name="metrics", mimeType="application/json",
+                                      description="Request latency, in-flight, payload and error metrics")
+
+    async def list_with_metrics(request):
+        if list_resources is None:
+            return types.ServerResult(types.ListResourcesResult(resources=[metrics_resource]))
+        result = await list_resources(request)
+        result.root.resources.append(metrics_resource)
+        return result
+
+    async def read_with_metrics(request):
+        if str(request.params.uri) == METRICS_URI:
+            return types.ServerResult(types.ReadResourceResult(contents=[types.TextResourceContents(
+                uri=METRICS_URI, mimeType="application/json", text=json.dumps(metrics.report(), indent=2),
+            )]))
+        if read_resource is None:
+            raise ValueError(f"Unknown resource: {request.params.uri}")
+        return await read_resource(request)
+
+    low.request_handlers[types.ListResourcesRequest] = list_with_metrics
+    low.request_handlers[types.ReadResourceRequest] = read_with_metrics
+
+    if PROM_PATH:
+        def dump_periodically():
+            while True:
+                time.sleep(PROM_INTERVAL_S)
+                metrics.dump(PROM_PATH)
+        threading.Thread(target=dump_periodically, name="mcp-metrics-dump", daemon=True).start()
+        atexit.register(metrics.dump, PROM_PATH)
+    return metrics
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Shared-daemon transport for the FastMCP servers in this repository
+
+By default a server runs over stdio, one server process per client. With
+``--transport http`` (streamable HTTP, endpoint ``/mcp``) or
+``--transport sse`` (endpoints ``/sse`` and ``/messages/``) it becomes a
+long-lived localhost daemon that many clients share, so warm caches and
+worker pools are built once instead of per spawn.
+
+    python mcp_server_a.py --transport http --port 8001
+    python certificate_server.py --transport http --uds /tmp/certificate.sock
+
+The daemon is served by uvicorn with:
+    keep-alive      idle HTTP connections stay open MCP_KEEPALIVE_S seconds
+    connection cap  beyond MCP_MAX_CONNECTIONS concurrent connections or
+                    requests new ones get 503 instead of queueing forever
+    graceful drain  on SIGINT/SIGTERM it stops accepting, lets in-flight
+                    requests finish for up to MCP_DRAIN_S seconds, then exits
+
+Every setting also reads an environment variable, so servers launched by
+other tools can be switched without changing their command line.
+
+Clients connect with ``streamablehttp_client("http://127.0.0.1:8001/mcp")``
+(or ``sse_client(".../sse")``). Each streamable-HTTP client holds about two
+connections (a standing GET stream plus its requests), so size the cap
+accordingly. Over a Unix socket, pass an httpx client bound to the socket
+and keep a port in the URL (``http://localhost:8000/mcp``): the servers'
+DNS-rebinding protection only accepts ``localhost:<port>`` host headers.
+"""
+
+import argparse
+import os
+import sys
+
+TRANSPORTS = ("stdio", "http", "sse")
+
+
+def options(argv=None) -> argparse.Namespace:
+    """Transport options from the command line, falling back to MCP_* environment variables"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--transport", choices=TRANSPORTS, default=os.getenv("MCP_TRANSPORT", "stdio"))
+    parser.add_argument("--host", default=os.getenv("MCP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MCP_PORT", "8000")))
+    parser.add_argument("--uds", default=os.getenv("MCP_UDS", ""), help="Serve on this Unix socket instead of TCP")
+    parser.add_argument("--keepalive", type=float, default=float(os.getenv("MCP_KEEPALIVE_S", "30")))
+    parser.add_argument("--max-connections", type=int, default=int(os.getenv("MCP_MAX_CONNECTIONS", "100")))
+    parser.add_argument("--drain", type=float, default=float(os.getenv("MCP_DRAIN_S", "30")))
+    # Servers may have arguments of their own; leave those alone
+    opts, _ = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    return opts
+
+
+def run(mcp, argv=None):
+    """Run a FastMCP server over stdio (default) or as a shared HTTP/SSE daemon"""
+    opts = options(argv)
+    if opts.transport == "stdio":
+        mcp.run()
+        return
+
+    import uvicorn
+
+    app = mcp.streamable_http_app() if opts.transport == "http" else mcp.sse_app()
+    path = mcp.settings.streamable_http_path if opts.transport == "http" else mcp.settings.sse_path
+    where = f"unix:{opts.uds}" if opts.uds else f"http://{opts.host}:{opts.port}"
+    print(f"Serving {mcp.name} ({opts.transport}) on {where}{path} "
+          f"[keep-alive {opts.keepalive:g}s, max {opts.max_connections} connections, drain {opts.drain:g}s]",
+          file=sys.stderr)
+    config = uvicorn.Config(
+        app,
+        host=opts.host,
+        port=opts.port,
+        uds=opts.uds or None,
+        timeout_keep_alive=int(opts.keepalive),
+        limit_concurrency=opts.max_connections or None,
+        timeout_graceful_shutdown=int(opts.drain),
+        log_level=mcp.settings.log_level.lower(),
+    )
+    uvicorn.Server(config).run()